@@ -3,21 +3,19 @@
 Exemplo básico de uso do Chatbot Validador de Documentos.
 
 Este exemplo demonstra como usar a biblioteca programaticamente
-sem a interface Streamlit.
+sem a interface Streamlit. O pacote deve estar instalado no ambiente
+(poetry install).
 """
-import sys
 import os
 import json
+import argparse
 from pathlib import Path
 
-# Adiciona o diretório src ao path
-sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
-
-from chatbot_document_validator.services.document_processor import DocumentProcessor
+from chatbot_document_validator.services.document_processor import DocumentProcessor, AsyncDocumentProcessor
 from chatbot_document_validator.utils.file_utils import FileProcessor
 
 
-def main():
+def main(batch: bool = False):
     """Exemplo principal de uso."""
     
     print("🤖 Chatbot Validador de Documentos - Exemplo de Uso")
@@ -41,6 +39,11 @@ def main():
         processor = DocumentProcessor(MINDEE_API_KEY, GROQ_API_KEY)
         print("✅ Processador inicializado com sucesso!")
         
+        if batch:
+            run_batch_example(processor, ["exemplo_cnh.pdf", "exemplo_rg.jpg"])
+            print("\n✅ Exemplos concluídos!")
+            return
+        
         # Exemplo 1: Processamento de CNH
         print("\n📄 Exemplo 1: Processamento de CNH")
         print("-" * 40)
@@ -86,6 +89,27 @@ def main():
             print(f"⚠️ Arquivo {rg_file_path} não encontrado")
             print("   Crie um arquivo de exemplo ou ajuste o caminho")
         
+        # Exemplo 3: Processamento concorrente
+        print("\n📄 Exemplo 3: Processamento concorrente")
+        print("-" * 40)
+        
+        # Os pollings do Mindee dos documentos correm em paralelo: o tempo total fica
+        # próximo ao do documento mais lento (arquivos já extraídos acima vêm do cache)
+        file_paths = [path for path in (cnh_file_path, rg_file_path) if os.path.exists(path)]
+        
+        if file_paths:
+            print(f"📋 Processando {len(file_paths)} arquivo(s) simultaneamente")
+            
+            results = AsyncDocumentProcessor(processor).process_documents(file_paths, auto_detect=True)
+            
+            for path, result in zip(file_paths, results):
+                if isinstance(result, Exception):
+                    print(f"❌ Erro ao processar {path}: {str(result)}")
+                else:
+                    display_results(result)
+        else:
+            print("⚠️ Nenhum arquivo de exemplo encontrado")
+        
         # Exemplo 4: Análise de arquivo
         print("\n📄 Exemplo 4: Análise de arquivo")
         print("-" * 40)
@@ -111,6 +135,31 @@ def main():
         print("   Verifique suas API Keys e conexão com a internet")
 
 
+def run_batch_example(processor, file_paths):
+    """Processa os arquivos de exemplo com validação em lote."""
+    
+    print("\n📦 Processamento em lote (Batch API do Groq)")
+    print("-" * 40)
+    
+    existing_files = [path for path in file_paths if os.path.exists(path)]
+    for path in file_paths:
+        if path not in existing_files:
+            print(f"⚠️ Arquivo {path} não encontrado")
+    
+    if not existing_files:
+        print("   Crie arquivos de exemplo ou ajuste os caminhos")
+        return
+    
+    print(f"📋 Processando {len(existing_files)} arquivo(s); o lote pode levar alguns minutos...")
+    results = processor.process_documents_batch(existing_files, auto_detect=True)
+    
+    for path, result in zip(existing_files, results):
+        if isinstance(result, Exception):
+            print(f"❌ Erro ao processar {path}: {str(result)}")
+        else:
+            display_results(result)
+
+
 def display_results(processed_doc):
     """Exibe resultados do processamento."""
     
@@ -196,7 +245,15 @@ def create_sample_files():
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Exemplo de uso do Chatbot Validador de Documentos")
+    parser.add_argument(
+        "--batch",
+        action="store_true",
+        help="Valida os documentos em lote pela Batch API do Groq (menor custo, maior latência)"
+    )
+    args = parser.parse_args()
+    
     # Descomente a linha abaixo para criar arquivos de exemplo
     # create_sample_files()
     
-    main() 
\ No newline at end of file
+    main(batch=args.batch)
@@ -4,6 +4,8 @@ Dados de exemplo baseados na estrutura real do Mindee.
 Use estes dados para testar a validação sem precisar de arquivos reais.
 """
 
+from types import MappingProxyType
+
 # Exemplo de resposta do Mindee para CNH
 SAMPLE_CNH_RESPONSE = {
     "fields": {
@@ -167,6 +169,27 @@ SAMPLE_RG_WITH_ISSUES = {
 }
 
 
+# Tabelas de despacho somente leitura: (tipo, com_problemas) -> dados
+_SAMPLES = MappingProxyType({
+    ("cnh", False): SAMPLE_CNH_RESPONSE,
+    ("cnh", True): SAMPLE_CNH_WITH_ISSUES,
+    ("rg", False): SAMPLE_RG_RESPONSE,
+    ("rg", True): SAMPLE_RG_WITH_ISSUES,
+})
+
+_EXPECTED_FIELDS = MappingProxyType({
+    "cnh": EXPECTED_CNH_FIELDS,
+    "rg": EXPECTED_RG_FIELDS,
+})
+
+
+def _normalize_document_type(document_type: str) -> str:
+    """Evita a conversão para minúsculas no caso comum."""
+    if document_type in _EXPECTED_FIELDS:
+        return document_type
+    return document_type.lower()
+
+
 def get_sample_data(document_type: str, with_issues: bool = False):
     """
     Retorna dados de exemplo para teste.
@@ -178,16 +201,10 @@ def get_sample_data(document_type: str, with_issues: bool = False):
     Returns:
         Dicionário com dados de exemplo
     """
-    if document_type.lower() == "cnh":
-        if with_issues:
-            return SAMPLE_CNH_WITH_ISSUES
-        return SAMPLE_CNH_RESPONSE
-    elif document_type.lower() == "rg":
-        if with_issues:
-            return SAMPLE_RG_WITH_ISSUES
-        return SAMPLE_RG_RESPONSE
-    else:
-        raise ValueError("document_type deve ser 'cnh' ou 'rg'")
+    try:
+        return _SAMPLES[_normalize_document_type(document_type), bool(with_issues)]
+    except KeyError:
+        raise ValueError("document_type deve ser 'cnh' ou 'rg'") from None
 
 
 def get_expected_fields(document_type: str):
@@ -200,12 +217,10 @@ def get_expected_fields(document_type: str):
     Returns:
         Dicionário com campos esperados
     """
-    if document_type.lower() == "cnh":
-        return EXPECTED_CNH_FIELDS
-    elif document_type.lower() == "rg":
-        return EXPECTED_RG_FIELDS
-    else:
-        raise ValueError("document_type deve ser 'cnh' ou 'rg'")
+    try:
+        return _EXPECTED_FIELDS[_normalize_document_type(document_type)]
+    except KeyError:
+        raise ValueError("document_type deve ser 'cnh' ou 'rg'") from None
 
 
 if __name__ == "__main__":
@@ -2,14 +2,25 @@
 Aplicação Streamlit para validação de documentos.
 """
 import streamlit as st
-import os
-import json
+import html
+import time
+from collections import Counter
 from datetime import datetime
 from typing import Optional
 
-from .services.document_processor import DocumentProcessor
+from .services.cache_service import ProcessedDocumentCache, ValidationCache
 from .utils.file_utils import FileProcessor
-from .models.document_models import ProcessedDocument, ValidationStatus
+from .models.document_models import ProcessedDocument, ValidationStatus, STATUS_UPPER, STATUS_CSS
+
+
+# Número máximo de documentos processados simultaneamente
+MAX_CONCURRENT_DOCUMENTS = 4
+
+# Número de resultados de validação mantidos em cache por sessão
+VALIDATION_CACHE_SIZE = 32
+
+# Número de documentos recentes exibidos com detalhes no histórico
+HISTORY_RECENT_LIMIT = 10
 
 
 def main():
@@ -108,9 +119,19 @@ def main():
         st.warning("⚠️ Configure as API Keys no sidebar para começar.")
         st.stop()
     
-    # Inicialização do processador
+    # Cache de validações da sessão
+    if 'validation_cache' not in st.session_state:
+        st.session_state.validation_cache = ValidationCache(max_size=VALIDATION_CACHE_SIZE)
+    
+    # Inicialização do processador (importado sob demanda: só é necessário com as API Keys)
+    from .services.document_processor import DocumentProcessor
+    
     try:
-        processor = DocumentProcessor(mindee_api_key, groq_api_key)
+        processor = DocumentProcessor(
+            mindee_api_key,
+            groq_api_key,
+            validation_cache=st.session_state.validation_cache
+        )
     except Exception as e:
         st.error(f"❌ Erro ao inicializar processador: {str(e)}")
         st.stop()
@@ -119,36 +140,45 @@ def main():
     col1, col2 = st.columns([2, 1])
     
     with col1:
-        st.header("📤 Upload de Documento")
+        st.header("📤 Upload de Documentos")
         
-        # Upload de arquivo
-        uploaded_file = st.file_uploader(
-            "Escolha um documento para validar",
+        # Upload de arquivos
+        uploaded_files = st.file_uploader(
+            "Escolha um ou mais documentos para validar",
             type=['pdf', 'jpg', 'jpeg', 'png', 'bmp', 'tiff', 'tif'],
-            help="Arraste um arquivo ou clique para selecionar"
+            accept_multiple_files=True,
+            help="Arraste arquivos ou clique para selecionar"
         )
         
-        if uploaded_file is not None:
-            # Validação do arquivo
-            is_valid, message = FileProcessor.validate_uploaded_file(uploaded_file)
+        if uploaded_files:
+            # Validação dos arquivos
+            valid_files = []
+            for uploaded_file in uploaded_files:
+                is_valid, message = FileProcessor.validate_uploaded_file(uploaded_file)
+                
+                if not is_valid:
+                    st.error(f"❌ {uploaded_file.name}: {message}")
+                else:
+                    valid_files.append(uploaded_file)
             
-            if not is_valid:
-                st.error(f"❌ {message}")
-            else:
-                st.success(f"✅ {message}")
+            if valid_files:
+                st.success(f"✅ {len(valid_files)} arquivo(s) válido(s).")
                 
-                # Informações do arquivo
-                file_info = {
-                    "Nome": uploaded_file.name,
-                    "Tamanho": f"{uploaded_file.size / (1024*1024):.2f} MB",
-                    "Tipo": uploaded_file.type
-                }
+                # Informações dos arquivos
+                files_info = [
+                    {
+                        "Nome": uploaded_file.name,
+                        "Tamanho": f"{uploaded_file.size / (1024*1024):.2f} MB",
+                        "Tipo": uploaded_file.type
+                    }
+                    for uploaded_file in valid_files
+                ]
                 
-                st.json(file_info)
+                st.json(files_info)
                 
                 # Botão de processamento
-                if st.button("🚀 Processar Documento", type="primary"):
-                    process_document(uploaded_file, processor, document_type, auto_detect)
+                if st.button("🚀 Processar Documentos", type="primary"):
+                    process_documents(valid_files, processor, document_type, auto_detect)
     
     with col2:
         st.header("📊 Estatísticas")
@@ -157,9 +187,10 @@ def main():
         if 'processed_documents' not in st.session_state:
             st.session_state.processed_documents = []
         
-        total_docs = len(st.session_state.processed_documents)
-        valid_docs = len([d for d in st.session_state.processed_documents if d.overall_status == ValidationStatus.VALID])
-        invalid_docs = len([d for d in st.session_state.processed_documents if d.overall_status == ValidationStatus.INVALID])
+        status_counts = Counter(d.overall_status for d in st.session_state.processed_documents)
+        total_docs = sum(status_counts.values())
+        valid_docs = status_counts[ValidationStatus.VALID]
+        invalid_docs = status_counts[ValidationStatus.INVALID]
         
         st.metric("Total Processados", total_docs)
         st.metric("Válidos", valid_docs)
@@ -173,43 +204,127 @@ def main():
     if st.session_state.processed_documents:
         st.header("📋 Histórico de Processamento")
         
-        for i, doc in enumerate(reversed(st.session_state.processed_documents)):
+        documents = st.session_state.processed_documents
+        recent_docs = documents[-HISTORY_RECENT_LIMIT:]
+        older_docs = documents[:-HISTORY_RECENT_LIMIT]
+        
+        for i, doc in enumerate(reversed(recent_docs)):
             display_document_result(doc, i)
+        
+        # Documentos antigos só são renderizados sob demanda, em formato resumido
+        if older_docs and st.toggle(
+            f"Mostrar histórico completo ({len(older_docs)} documento(s) anteriores)",
+            key="show_full_history"
+        ):
+            for doc in reversed(older_docs):
+                st.markdown(
+                    render_history_summary(
+                        doc.file_name,
+                        doc.upload_time.strftime('%H:%M:%S'),
+                        STATUS_UPPER[doc.overall_status],
+                        STATUS_CSS[doc.overall_status],
+                        doc.validation_result.confidence
+                    ),
+                    unsafe_allow_html=True
+                )
+
+
+def render_history_summary(
+    file_name: str,
+    upload_time: str,
+    status_label: str,
+    status_class: str,
+    confidence: float
+) -> str:
+    """Gera a linha de resumo em HTML de um documento do histórico."""
+    return (
+        f"📄 **{html.escape(file_name)}** - {upload_time} · "
+        f"<span class='{status_class}'>{status_label}</span> · "
+        f"confiança {confidence:.1%}"
+    )
+
 
+@st.cache_resource
+def get_document_cache() -> ProcessedDocumentCache:
+    """Retorna o cache de documentos processados compartilhado entre sessões."""
+    return ProcessedDocumentCache()
 
-def process_document(uploaded_file, processor, document_type, auto_detect):
-    """Processa um documento."""
+
+def process_documents(uploaded_files, processor, document_type, auto_detect):
+    """Processa documentos concorrentemente."""
+    
+    cache = get_document_cache()
+    pending_documents = []
+    cache_keys = []
     
     try:
-        # Salva arquivo temporário
-        temp_path = FileProcessor.save_uploaded_file(uploaded_file)
-        
-        if not temp_path:
-            st.error("❌ Erro ao salvar arquivo temporário")
-            return
+        if 'processed_documents' not in st.session_state:
+            st.session_state.processed_documents = []
         
-        try:
-            # Processa documento
-            with st.spinner("🔄 Processando documento..."):
-                processed_doc = processor.process_document(
-                    temp_path, 
-                    document_type=document_type,
-                    auto_detect=auto_detect
+        for uploaded_file in uploaded_files:
+            data = uploaded_file.getvalue()
+            
+            # Documentos idênticos já processados são servidos do cache
+            resolved_type = document_type
+            if auto_detect and not resolved_type:
+                resolved_type = FileProcessor.get_document_type_from_filename(uploaded_file.name)
+            
+            cache_key = cache.make_key(data, resolved_type or "")
+            cached_doc = cache.get(cache_key)
+            
+            if cached_doc is not None:
+                # O horário de upload é o deste envio, não o do processamento original
+                cached_doc = cached_doc.model_copy(
+                    update={"file_name": uploaded_file.name, "upload_time_ns": time.time_ns()}
                 )
+                st.session_state.processed_documents.append(cached_doc)
+                st.success(f"✅ Documento {cached_doc.file_name} recuperado do cache!")
+                display_document_result(cached_doc, 0)
+                continue
             
-            # Adiciona à sessão
-            if 'processed_documents' not in st.session_state:
-                st.session_state.processed_documents = []
+            # O conteúdo em memória é enviado diretamente, sem arquivo temporário
+            pending_documents.append((data, uploaded_file.name))
+            cache_keys.append(cache_key)
+        
+        if not pending_documents:
+            return
+        
+        # Processa documentos
+        from .services.document_processor import AsyncDocumentProcessor
+        
+        progress_bar = st.progress(0.0, text="🔄 Processando documentos...")
+        
+        def update_progress(completed: int, total: int):
+            progress_bar.progress(
+                completed / total,
+                text=f"🔄 Processados {completed}/{total} documentos"
+            )
+        
+        async_processor = AsyncDocumentProcessor(
+            processor,
+            max_concurrency=MAX_CONCURRENT_DOCUMENTS
+        )
+        results = async_processor.process_documents(
+            pending_documents,
+            document_type=document_type,
+            auto_detect=auto_detect,
+            on_complete=update_progress
+        )
+        
+        for (_, file_name), cache_key, result in zip(pending_documents, cache_keys, results):
+            if isinstance(result, Exception):
+                st.error(f"❌ Erro no processamento de {file_name}: {str(result)}")
+                continue
             
-            st.session_state.processed_documents.append(processed_doc)
+            # Adiciona à sessão; só validações concluídas vão para o cache, falhas
+            # transitórias (Groq, rede) são refeitas no próximo envio
+            st.session_state.processed_documents.append(result)
+            if result.validation_result.completed and not cache.put(cache_key, result):
+                st.warning(f"⚠️ Não foi possível salvar {result.file_name} no cache")
             
             # Exibe resultado
-            st.success("✅ Documento processado com sucesso!")
-            display_document_result(processed_doc, 0)
-            
-        finally:
-            # Limpa arquivo temporário
-            FileProcessor.cleanup_temp_file(temp_path)
+            st.success(f"✅ Documento {result.file_name} processado com sucesso!")
+            display_document_result(result, 0)
     
     except Exception as e:
         st.error(f"❌ Erro no processamento: {str(e)}")
@@ -218,14 +333,10 @@ def process_document(uploaded_file, processor, document_type, auto_detect):
 def display_document_result(processed_doc: ProcessedDocument, index: int):
     """Exibe resultado do processamento de um documento."""
     
-    # Determina cor do status
-    status_colors = {
-        ValidationStatus.VALID: "status-valid",
-        ValidationStatus.INVALID: "status-invalid",
-        ValidationStatus.WARNING: "status-warning"
-    }
-    
-    status_class = status_colors.get(processed_doc.overall_status, "")
+    # Determina rótulo e cor do status
+    status = processed_doc.overall_status
+    status_label = STATUS_UPPER[status]
+    status_class = STATUS_CSS[status]
     
     # Cabeçalho do resultado
     with st.expander(f"📄 {processed_doc.file_name} - {processed_doc.upload_time.strftime('%H:%M:%S')}"):
@@ -236,7 +347,7 @@ def display_document_result(processed_doc: ProcessedDocument, index: int):
         with col1:
             st.metric(
                 "Status", 
-                processed_doc.overall_status.value.upper(),
+                status_label,
                 delta=None
             )
         
@@ -256,7 +367,7 @@ def display_document_result(processed_doc: ProcessedDocument, index: int):
         st.subheader("🔍 Resultado da Validação")
         
         # Status com cor
-        status_text = f"<span class='{status_class}'>{processed_doc.overall_status.value.upper()}</span>"
+        status_text = f"<span class='{status_class}'>{status_label}</span>"
         st.markdown(f"**Status:** {status_text}", unsafe_allow_html=True)
         
         # Análise
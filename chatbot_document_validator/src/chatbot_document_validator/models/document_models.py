@@ -1,10 +1,40 @@
 """
 Modelos de dados para documentos e validação.
 """
-from pydantic import BaseModel, Field
+import time
+from pydantic import BaseModel, ConfigDict, Field, model_validator
 from typing import Dict, Any, List, Optional
 from datetime import datetime
 from enum import Enum
+from functools import cached_property
+
+
+def _from_ns(timestamp_ns: int) -> datetime:
+    """Converte um timestamp em nanossegundos para datetime local."""
+    seconds, nanoseconds = divmod(timestamp_ns, 1_000_000_000)
+    return datetime.fromtimestamp(seconds).replace(microsecond=nanoseconds // 1000)
+
+
+def _to_ns(value: Any) -> Any:
+    """Converte um horário no formato antigo (datetime ou texto ISO) para nanossegundos."""
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if isinstance(value, datetime):
+        return int(value.replace(microsecond=0).timestamp()) * 1_000_000_000 + value.microsecond * 1000
+    return value
+
+
+def _convert_legacy_timestamps(data: Any, names: Dict[str, str]) -> Any:
+    """Troca os campos de horário antigos (datetime) pelos equivalentes em nanossegundos."""
+    if not isinstance(data, dict) or not any(old in data for old in names):
+        return data
+    
+    data = dict(data)
+    for old, new in names.items():
+        if old in data:
+            value = data.pop(old)
+            data.setdefault(new, _to_ns(value))
+    return data
 
 
 class DocumentType(str, Enum):
@@ -21,8 +51,21 @@ class ValidationStatus(str, Enum):
     ERROR = "error"
 
 
+# Rótulos e classes CSS pré-calculados para exibição dos status
+STATUS_UPPER = {status: status.value.upper() for status in ValidationStatus}
+
+STATUS_CSS = {
+    ValidationStatus.VALID: "status-valid",
+    ValidationStatus.INVALID: "status-invalid",
+    ValidationStatus.WARNING: "status-warning",
+    ValidationStatus.ERROR: ""
+}
+
+
 class ExtractedField(BaseModel):
     """Campo extraído de um documento."""
+    model_config = ConfigDict(frozen=True, extra="ignore")
+    
     value: Optional[str] = None
     confidence: float = 0.0
     bounding_box: Optional[Dict[str, float]] = None
@@ -30,6 +73,8 @@ class ExtractedField(BaseModel):
 
 class DocumentData(BaseModel):
     """Dados extraídos de um documento."""
+    model_config = ConfigDict(frozen=True, extra="ignore")
+    
     document_type: DocumentType
     extracted_fields: Dict[str, ExtractedField] = Field(default_factory=dict)
     raw_response: Dict[str, Any] = Field(default_factory=dict)
@@ -39,6 +84,8 @@ class DocumentData(BaseModel):
 
 class ValidationResult(BaseModel):
     """Resultado da validação de um documento."""
+    model_config = ConfigDict(frozen=True, extra="ignore")
+    
     is_valid: bool
     confidence: float = 0.0
     errors: List[str] = Field(default_factory=list)
@@ -47,6 +94,9 @@ class ValidationResult(BaseModel):
     recommendations: List[str] = Field(default_factory=list)
     validation_time: Optional[float] = None
     
+    # False quando a validação não terminou (erro de rede ou resposta inválida do Groq)
+    completed: bool = True
+    
     # Campos específicos por tipo de documento
     cnh_specific_errors: List[str] = Field(default_factory=list)
     cnh_specific_warnings: List[str] = Field(default_factory=list)
@@ -56,44 +106,68 @@ class ValidationResult(BaseModel):
 
 class ProcessedDocument(BaseModel):
     """Documento processado com dados extraídos e validação."""
+    model_config = ConfigDict(frozen=True, extra="ignore")
+    
     document_data: DocumentData
     validation_result: ValidationResult
     file_name: str
     file_size: Optional[int] = None
-    upload_time: datetime = Field(default_factory=datetime.now)
+    upload_time_ns: int = Field(default_factory=time.time_ns)
     
-    @property
+    @model_validator(mode="before")
+    @classmethod
+    def _accept_legacy_upload_time(cls, data: Any) -> Any:
+        """Aceita upload_time (datetime), o nome anterior de upload_time_ns."""
+        return _convert_legacy_timestamps(data, {"upload_time": "upload_time_ns"})
+    
+    # Modelo imutável: as propriedades derivadas são calculadas uma única vez
+    @cached_property
+    def upload_time(self) -> datetime:
+        """Retorna o horário de upload para exibição."""
+        return _from_ns(self.upload_time_ns)
+    
+    @cached_property
     def overall_status(self) -> ValidationStatus:
         """Retorna o status geral do documento."""
-        if not self.validation_result.is_valid:
+        result = self.validation_result
+        if not result.is_valid:
             return ValidationStatus.INVALID
-        elif self.validation_result.warnings or self.validation_result.cnh_specific_warnings or self.validation_result.rg_specific_warnings:
+        elif result.warnings or result.cnh_specific_warnings or result.rg_specific_warnings:
             return ValidationStatus.WARNING
         else:
             return ValidationStatus.VALID
     
-    @property
+    @cached_property
     def all_errors(self) -> List[str]:
         """Retorna todos os erros encontrados."""
-        errors = self.validation_result.errors.copy()
-        errors.extend(self.validation_result.cnh_specific_errors)
-        errors.extend(self.validation_result.rg_specific_errors)
-        return errors
+        result = self.validation_result
+        return [*result.errors, *result.cnh_specific_errors, *result.rg_specific_errors]
     
-    @property
+    @cached_property
     def all_warnings(self) -> List[str]:
         """Retorna todos os avisos encontrados."""
-        warnings = self.validation_result.warnings.copy()
-        warnings.extend(self.validation_result.cnh_specific_warnings)
-        warnings.extend(self.validation_result.rg_specific_warnings)
-        return warnings
+        result = self.validation_result
+        return [*result.warnings, *result.cnh_specific_warnings, *result.rg_specific_warnings]
 
 
 class ChatMessage(BaseModel):
     """Mensagem do chat."""
+    model_config = ConfigDict(frozen=True, extra="ignore")
+    
     role: str  # "user" ou "assistant"
     content: str
-    timestamp: datetime = Field(default_factory=datetime.now)
+    timestamp_ns: int = Field(default_factory=time.time_ns)
+    
+    @model_validator(mode="before")
+    @classmethod
+    def _accept_legacy_timestamp(cls, data: Any) -> Any:
+        """Aceita timestamp (datetime), o nome anterior de timestamp_ns."""
+        return _convert_legacy_timestamps(data, {"timestamp": "timestamp_ns"})
+    
+    @cached_property
+    def timestamp(self) -> datetime:
+        """Retorna o horário da mensagem para exibição."""
+        return _from_ns(self.timestamp_ns)
 
 
 class ChatSession(BaseModel):
@@ -101,5 +175,23 @@ class ChatSession(BaseModel):
     session_id: str
     messages: List[ChatMessage] = Field(default_factory=list)
     processed_documents: List[ProcessedDocument] = Field(default_factory=list)
-    created_at: datetime = Field(default_factory=datetime.now)
-    updated_at: datetime = Field(default_factory=datetime.now) 
\ No newline at end of file
+    created_at_ns: int = Field(default_factory=time.time_ns)
+    updated_at_ns: int = Field(default_factory=time.time_ns)
+    
+    @model_validator(mode="before")
+    @classmethod
+    def _accept_legacy_timestamps(cls, data: Any) -> Any:
+        """Aceita created_at e updated_at (datetime), os nomes anteriores dos campos em nanossegundos."""
+        return _convert_legacy_timestamps(
+            data, {"created_at": "created_at_ns", "updated_at": "updated_at_ns"}
+        )
+    
+    @property
+    def created_at(self) -> datetime:
+        """Retorna o horário de criação da sessão."""
+        return _from_ns(self.created_at_ns)
+    
+    @property
+    def updated_at(self) -> datetime:
+        """Retorna o horário da última atualização da sessão."""
+        return _from_ns(self.updated_at_ns) 
\ No newline at end of file
@@ -0,0 +1,210 @@
+"""
+Caches de documentos processados, de extrações do Mindee e de resultados de validação.
+"""
+import copy
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Any, Optional
+import orjson
+
+from ..models.document_models import ProcessedDocument
+
+
+logger = logging.getLogger(__name__)
+
+# Versão do pipeline de processamento; altere para invalidar resultados em cache
+PROCESSOR_VERSION = "1"
+
+# Diretório padrão do cache em disco; pode ser alterado pela variável de ambiente DOCUMENT_CACHE_DIR
+DEFAULT_CACHE_DIR = Path(
+    os.environ.get("DOCUMENT_CACHE_DIR")
+    or Path(tempfile.gettempdir()) / "chatbot_document_validator" / "processed"
+)
+
+# Tempo de vida das entradas do cache em disco (24 horas)
+DEFAULT_CACHE_TTL = 24 * 60 * 60
+
+# Número máximo de documentos mantidos no cache em disco
+DEFAULT_CACHE_MAX_ENTRIES = 256
+
+
+class ProcessedDocumentCache:
+    """
+    Cache em disco de documentos processados, chaveado pelo SHA-256 do arquivo.
+    
+    As entradas contêm dados pessoais: o diretório e os arquivos são privados ao
+    usuário do processo, expiram ttl_seconds após a gravação e são limitados a
+    max_entries, descartando primeiro as gravadas há mais tempo.
+    """
+    
+    def __init__(
+        self,
+        cache_dir: Optional[str] = None,
+        version: str = PROCESSOR_VERSION,
+        ttl_seconds: float = DEFAULT_CACHE_TTL,
+        max_entries: int = DEFAULT_CACHE_MAX_ENTRIES
+    ):
+        self.cache_dir = Path(cache_dir) if cache_dir else DEFAULT_CACHE_DIR
+        self.version = version
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.cache_dir.mkdir(mode=0o700, parents=True, exist_ok=True)
+        # mkdir não altera diretórios existentes e respeita a umask
+        os.chmod(self.cache_dir, 0o700)
+    
+    def make_key(self, data: bytes, document_type: str) -> str:
+        """
+        Gera a chave do cache para o conteúdo de um arquivo.
+        
+        Args:
+            data: Conteúdo do arquivo
+            document_type: Tipo do documento (cnh, rg)
+            
+        Returns:
+            Hash hexadecimal de (tamanho, conteúdo, tipo, versão do processador)
+        """
+        digest = hashlib.sha256(len(data).to_bytes(8, "little"))
+        digest.update(data)
+        digest.update(b"\0" + document_type.encode())
+        digest.update(b"\0" + self.version.encode())
+        return digest.hexdigest()
+    
+    def get(self, key: str) -> Optional[ProcessedDocument]:
+        """Retorna o documento em cache ou None se não existir ou estiver inválido."""
+        path = self._path(key)
+        try:
+            if time.time() - path.stat().st_mtime > self.ttl_seconds:
+                path.unlink(missing_ok=True)
+                return None
+        except OSError:
+            return None
+        
+        try:
+            payload = orjson.loads(path.read_bytes())
+            return ProcessedDocument.model_validate(payload["processed_document"])
+        except (OSError, ValueError, KeyError, TypeError):
+            # Entrada corrompida ou de um esquema antigo: descarta
+            path.unlink(missing_ok=True)
+            return None
+    
+    def put(self, key: str, processed_doc: ProcessedDocument) -> bool:
+        """Armazena um documento processado no cache; retorna False se a gravação falhar."""
+        payload = {
+            "cached_at": datetime.now(timezone.utc).isoformat(),
+            "processed_document": processed_doc.model_dump(mode="json")
+        }
+        
+        path = self._path(key)
+        temp_path = path.with_suffix(".tmp")
+        try:
+            data = orjson.dumps(payload)
+            fd = os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, "wb") as fh:
+                fh.write(data)
+            os.replace(temp_path, path)
+        except (OSError, TypeError, ValueError) as e:
+            temp_path.unlink(missing_ok=True)
+            logger.warning("Erro ao salvar documento no cache: %s", e)
+            return False
+        
+        self._evict()
+        return True
+    
+    def _evict(self) -> None:
+        """
+        Remove entradas expiradas e, além de max_entries, as gravadas há mais tempo (FIFO).
+        
+        Leituras não renovam a entrada: o TTL conta a partir da gravação, limitando
+        por quanto tempo os dados pessoais ficam em disco.
+        """
+        now = time.time()
+        entries = []
+        for entry in self.cache_dir.glob("*.json"):
+            try:
+                mtime = entry.stat().st_mtime
+            except OSError:
+                continue
+            if now - mtime > self.ttl_seconds:
+                entry.unlink(missing_ok=True)
+            else:
+                entries.append((mtime, entry))
+        
+        if len(entries) > self.max_entries:
+            entries.sort()
+            for _, entry in entries[:len(entries) - self.max_entries]:
+                entry.unlink(missing_ok=True)
+    
+    def _path(self, key: str) -> Path:
+        """Caminho do arquivo de cache para uma chave."""
+        return self.cache_dir / f"{key}.json"
+
+
+class LRUCache:
+    """Cache LRU em memória e thread-safe de dicionários; entradas são copiadas na leitura e na escrita."""
+    
+    def __init__(self, max_size: int = 32):
+        self.max_size = max_size
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Retorna uma cópia do resultado em cache ou None."""
+        with self._lock:
+            result = self._entries.get(key)
+            if result is None:
+                return None
+            self._entries.move_to_end(key)
+            return copy.deepcopy(result)
+    
+    def put(self, key: str, result: Dict[str, Any]) -> None:
+        """Armazena um resultado, descartando o menos usado recentemente se necessário."""
+        with self._lock:
+            self._entries[key] = copy.deepcopy(result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class ValidationCache(LRUCache):
+    """Cache LRU de resultados de validação, chaveado pelos campos extraídos."""
+    
+    @staticmethod
+    def make_key(fields: Dict[str, Any], document_type: str) -> str:
+        """Gera a chave do cache a partir dos campos extraídos normalizados."""
+        normalized = orjson.dumps(
+            [document_type, sorted(fields.items())],
+            default=str,
+            option=orjson.OPT_NON_STR_KEYS
+        )
+        return hashlib.sha256(normalized).hexdigest()
+
+
+class ExtractionCache(LRUCache):
+    """Cache LRU de extrações do Mindee, chaveado pelo conteúdo do arquivo."""
+    
+    @staticmethod
+    def make_key(data: bytes, document_type: str) -> str:
+        """Gera a chave do cache a partir do conteúdo em memória."""
+        digest = hashlib.blake2b(data, digest_size=16)
+        digest.update(b"\0" + document_type.encode())
+        return digest.hexdigest()
+    
+    @staticmethod
+    def make_file_key(file_path: str, document_type: str) -> str:
+        """Gera a mesma chave de make_key lendo o arquivo em blocos de 64 KB."""
+        digest = hashlib.blake2b(digest_size=16)
+        with open(file_path, "rb") as fh:
+            for chunk in iter(lambda: fh.read(65536), b""):
+                digest.update(chunk)
+        digest.update(b"\0" + document_type.encode())
+        return digest.hexdigest()
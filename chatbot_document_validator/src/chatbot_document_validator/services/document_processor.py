@@ -1,12 +1,19 @@
 """
 Serviço principal para processamento de documentos.
 """
+import asyncio
 import time
-from typing import Dict, Any, Optional
+from functools import cached_property, lru_cache
+from pathlib import Path
+from typing import Dict, Any, Optional, List, Callable, Union, Tuple
+import httpx
 import streamlit as st
+from groq import AsyncGroq
+from pydantic import TypeAdapter
 
 from ..services.mindee_service import MindeeService
 from ..services.validation_service import DocumentValidationService
+from ..services.cache_service import ValidationCache
 from ..utils.file_utils import FileProcessor, DocumentAnalyzer
 from ..models.document_models import (
     DocumentData, 
@@ -17,18 +24,55 @@ from ..models.document_models import (
 )
 
 
+# Valida todos os campos extraídos do Mindee em uma única chamada
+_EXTRACTED_FIELDS_ADAPTER = TypeAdapter(Dict[str, ExtractedField])
+
+# Caminho de arquivo ou par (conteúdo, nome do arquivo)
+DocumentSource = Union[str, Tuple[bytes, str]]
+
+
+@lru_cache(maxsize=8)
+def _mindee_service(api_key: str) -> MindeeService:
+    """Serviço Mindee compartilhado por chave: reruns reaproveitam a sessão HTTP e o cache."""
+    return MindeeService(api_key)
+
+
+@lru_cache(maxsize=8)
+def _validation_service(api_key: str) -> DocumentValidationService:
+    """Serviço de validação compartilhado por chave; o cache de validações da sessão vai em cada chamada."""
+    return DocumentValidationService(api_key)
+
+
 class DocumentProcessor:
     """Serviço principal para processamento e validação de documentos."""
     
-    def __init__(self, mindee_api_key: str, groq_api_key: str):
-        self.mindee_service = MindeeService(mindee_api_key)
-        self.validation_service = DocumentValidationService(groq_api_key)
+    def __init__(
+        self,
+        mindee_api_key: str,
+        groq_api_key: str,
+        validation_cache: Optional[ValidationCache] = None
+    ):
+        self._mindee_api_key = mindee_api_key
+        self._groq_api_key = groq_api_key
+        self._validation_cache = validation_cache
+    
+    # Serviços obtidos sob demanda e compartilhados entre instâncias com as mesmas chaves
+    @cached_property
+    def mindee_service(self) -> MindeeService:
+        """Serviço de extração do Mindee."""
+        return _mindee_service(self._mindee_api_key)
+    
+    @cached_property
+    def validation_service(self) -> DocumentValidationService:
+        """Serviço de validação com Groq."""
+        return _validation_service(self._groq_api_key)
     
     def process_document(
         self, 
         file_path: str, 
         document_type: Optional[str] = None,
-        auto_detect: bool = True
+        auto_detect: bool = True,
+        filename: Optional[str] = None
     ) -> ProcessedDocument:
         """
         Processa um documento completo: extração + validação.
@@ -37,6 +81,8 @@ class DocumentProcessor:
             file_path: Caminho para o arquivo
             document_type: Tipo do documento (cnh, rg)
             auto_detect: Se deve detectar automaticamente o tipo
+            filename: Nome original do arquivo (ex.: uploaded_file.name para arquivos
+                salvos com FileProcessor.save_uploaded_file); por padrão, o nome em disco
             
         Returns:
             Documento processado com dados extraídos e validação
@@ -44,57 +90,372 @@ class DocumentProcessor:
         start_time = time.time()
         
         try:
-            # Validação inicial do arquivo
+            # Validação inicial do arquivo (pela extensão, sem acessar o disco)
             if not FileProcessor.is_supported_file(file_path):
                 raise ValueError("Tipo de arquivo não suportado")
             
-            if not FileProcessor.validate_file_size(file_path):
+            # Análise do documento; o tamanho vem do mesmo stat
+            analysis = DocumentAnalyzer.analyze_document_content(file_path, filename)
+            
+            if not analysis or analysis["file_size"] > FileProcessor.MAX_FILE_SIZE:
+                raise ValueError("Arquivo muito grande")
+            
+            return self._process_analyzed_document(
+                analysis,
+                lambda doc_type: self.mindee_service.extract_document_data(
+                    file_path, doc_type, analysis['filename']
+                ),
+                document_type,
+                auto_detect,
+                start_time
+            )
+            
+        except Exception as e:
+            st.error(f"Erro no processamento: {str(e)}")
+            raise
+    
+    def process_document_bytes(
+        self,
+        data: bytes,
+        filename: str,
+        document_type: Optional[str] = None,
+        auto_detect: bool = True
+    ) -> ProcessedDocument:
+        """
+        Processa um documento em memória, sem gravá-lo em disco.
+        
+        Args:
+            data: Conteúdo do arquivo
+            filename: Nome do arquivo
+            document_type: Tipo do documento (cnh, rg)
+            auto_detect: Se deve detectar automaticamente o tipo
+            
+        Returns:
+            Documento processado com dados extraídos e validação
+        """
+        start_time = time.time()
+        
+        try:
+            # Validação inicial do arquivo
+            if not FileProcessor.is_supported_file(filename):
+                raise ValueError("Tipo de arquivo não suportado")
+            
+            if len(data) > FileProcessor.MAX_FILE_SIZE:
                 raise ValueError("Arquivo muito grande")
             
             # Análise do documento
-            analysis = DocumentAnalyzer.analyze_document_content(file_path)
+            analysis = DocumentAnalyzer.analyze_document_bytes(data, filename)
+            
+            return self._process_analyzed_document(
+                analysis,
+                lambda doc_type: self.mindee_service.extract_document_data_from_bytes(
+                    data, filename, doc_type
+                ),
+                document_type,
+                auto_detect,
+                start_time
+            )
+            
+        except Exception as e:
+            st.error(f"Erro no processamento: {str(e)}")
+            raise
+    
+    async def process_document_async(
+        self,
+        file_path: str,
+        document_type: Optional[str] = None,
+        auto_detect: bool = True,
+        *,
+        client: httpx.AsyncClient,
+        groq_client: AsyncGroq
+    ) -> ProcessedDocument:
+        """
+        Versão assíncrona de process_document.
+        
+        Args:
+            file_path: Caminho para o arquivo
+            document_type: Tipo do documento (cnh, rg)
+            auto_detect: Se deve detectar automaticamente o tipo
+            client: Cliente HTTP compartilhado do Mindee (ver MindeeService.create_async_client)
+            groq_client: Cliente compartilhado do Groq (ver DocumentValidationService.create_async_groq_client)
+            
+        Returns:
+            Documento processado com dados extraídos e validação
+        """
+        try:
+            if not FileProcessor.is_supported_file(file_path):
+                raise ValueError("Tipo de arquivo não suportado")
+            
+            path = Path(file_path)
+            data = await asyncio.to_thread(path.read_bytes)
+        except Exception as e:
+            st.error(f"Erro no processamento: {str(e)}")
+            raise
+        
+        return await self.process_document_bytes_async(
+            data, path.name, document_type, auto_detect, client=client, groq_client=groq_client
+        )
+    
+    async def process_document_bytes_async(
+        self,
+        data: bytes,
+        filename: str,
+        document_type: Optional[str] = None,
+        auto_detect: bool = True,
+        *,
+        client: httpx.AsyncClient,
+        groq_client: AsyncGroq
+    ) -> ProcessedDocument:
+        """
+        Versão assíncrona de process_document_bytes.
+        
+        A extração no Mindee e a validação no Groq usam clientes assíncronos
+        compartilhados, de modo que vários documentos aguardam o polling e as respostas
+        simultaneamente no mesmo event loop.
+        
+        Args:
+            data: Conteúdo do arquivo
+            filename: Nome do arquivo
+            document_type: Tipo do documento (cnh, rg)
+            auto_detect: Se deve detectar automaticamente o tipo
+            client: Cliente HTTP compartilhado do Mindee (ver MindeeService.create_async_client)
+            groq_client: Cliente compartilhado do Groq (ver DocumentValidationService.create_async_groq_client)
             
-            # Determina tipo do documento
-            if auto_detect and not document_type:
-                document_type = analysis.get("inferred_document_type")
+        Returns:
+            Documento processado com dados extraídos e validação
+        """
+        start_time = time.time()
+        
+        try:
+            # Validação inicial do arquivo
+            if not FileProcessor.is_supported_file(filename):
+                raise ValueError("Tipo de arquivo não suportado")
             
-            document_type = document_type
+            if len(data) > FileProcessor.MAX_FILE_SIZE:
+                raise ValueError("Arquivo muito grande")
             
-            st.info(f"Processando documento: {analysis['filename']} (Tipo: {document_type})")
+            document_type = self._resolve_document_type(filename, document_type, auto_detect)
             
-            # Extração de dados com Mindee
+            # Extração de dados com Mindee; a análise local ocorre durante o upload/polling
             extraction_start = time.time()
-            extracted_data = self.mindee_service.extract_document_data(file_path, document_type)
+            extraction_task = asyncio.create_task(
+                self.mindee_service.extract_document_data_from_bytes_async(
+                    data, filename, document_type, client
+                )
+            )
+            analysis = DocumentAnalyzer.analyze_document_bytes(data, filename)
+            extracted_data = await extraction_task
             extraction_time = time.time() - extraction_start
             
-            # Converte para modelo de dados
-            document_data = self._convert_to_document_data(extracted_data, analysis, extraction_time)
-            
-            # Validação com Groq
+            # Validação com Groq; a conversão dos dados extraídos ocorre durante a chamada
             validation_start = time.time()
-            validation_result = self.validation_service.validate_document(extracted_data, document_type)
+            validation_task = asyncio.create_task(
+                self.validation_service.validate_document_async(
+                    extracted_data, document_type, groq_client, self._validation_cache
+                )
+            )
+            document_data = self._convert_to_document_data(extracted_data, analysis, extraction_time)
+            validation_result = await validation_task
             validation_time = time.time() - validation_start
             
-            # Converte para modelo de dados
-            validation_data = self._convert_to_validation_result(validation_result, validation_time)
+            return self._build_processed_document(
+                analysis,
+                document_data,
+                validation_result,
+                validation_time,
+                start_time
+            )
+            
+        except Exception as e:
+            st.error(f"Erro no processamento: {str(e)}")
+            raise
+    
+    def process_documents_batch(
+        self,
+        file_paths: List[str],
+        document_type: Optional[str] = None,
+        auto_detect: bool = True,
+        max_concurrency: int = 4
+    ) -> List[Union[ProcessedDocument, Exception]]:
+        """
+        Processa vários documentos validando-os pela Batch API do Groq.
+        
+        As extrações no Mindee rodam concorrentemente e todas as validações são
+        enviadas em um único lote. Indicado para execuções offline: o custo é
+        menor, mas a validação pode levar horas.
+        
+        Args:
+            file_paths: Caminhos dos arquivos
+            document_type: Tipo do documento (cnh, rg)
+            auto_detect: Se deve detectar automaticamente o tipo
+            max_concurrency: Número máximo de extrações simultâneas
+            
+        Returns:
+            Lista na mesma ordem de file_paths com o documento processado ou a exceção
+        """
+        start_time = time.time()
+        
+        # Extração concorrente com Mindee
+        results = asyncio.run(
+            self._extract_many_async(file_paths, document_type, auto_detect, max_concurrency)
+        )
+        extracted = [
+            (index, result) for index, result in enumerate(results)
+            if not isinstance(result, Exception)
+        ]
+        
+        if not extracted:
+            return results
+        
+        # Validação em lote com Groq
+        validation_start = time.time()
+        validation_results = self.validation_service.validate_documents_batch([
+            (extracted_data, doc_type)
+            for _, (_, doc_type, extracted_data, _) in extracted
+        ])
+        validation_time = time.time() - validation_start
+        
+        for (index, (analysis, _, extracted_data, extraction_time)), validation_result in zip(
+            extracted, validation_results
+        ):
+            document_data = self._convert_to_document_data(extracted_data, analysis, extraction_time)
+            results[index] = self._build_processed_document(
+                analysis,
+                document_data,
+                validation_result,
+                validation_time,
+                start_time
+            )
+        
+        return results
+    
+    async def _extract_many_async(
+        self,
+        file_paths: List[str],
+        document_type: Optional[str],
+        auto_detect: bool,
+        max_concurrency: int
+    ) -> List[Union[Tuple[Dict[str, Any], Optional[str], Dict[str, Any], float], Exception]]:
+        """Extrai os dados de vários arquivos concorrentemente com um cliente HTTP compartilhado."""
+        semaphore = asyncio.Semaphore(max_concurrency)
+        
+        async with MindeeService.create_async_client() as client:
+            
+            async def extract(file_path: str):
+                async with semaphore:
+                    return await self._extract_file_async(file_path, document_type, auto_detect, client)
             
-            # Cria documento processado
-            processed_doc = ProcessedDocument(
-                document_data=document_data,
-                validation_result=validation_data,
-                file_name=analysis['filename'],
-                file_size=analysis['file_size']
+            return await asyncio.gather(
+                *(extract(file_path) for file_path in file_paths),
+                return_exceptions=True
             )
+    
+    async def _extract_file_async(
+        self,
+        file_path: str,
+        document_type: Optional[str],
+        auto_detect: bool,
+        client: httpx.AsyncClient
+    ) -> Tuple[Dict[str, Any], Optional[str], Dict[str, Any], float]:
+        """Extrai os dados de um arquivo; retorna (análise, tipo, dados extraídos, tempo de extração)."""
+        try:
+            if not FileProcessor.is_supported_file(file_path):
+                raise ValueError("Tipo de arquivo não suportado")
             
-            total_time = time.time() - start_time
-            st.success(f"Processamento concluído em {total_time:.2f}s")
+            if not FileProcessor.validate_file_size(file_path):
+                raise ValueError("Arquivo muito grande")
             
-            return processed_doc
+            path = Path(file_path)
+            data = await asyncio.to_thread(path.read_bytes)
+            analysis = DocumentAnalyzer.analyze_document_bytes(data, path.name)
+            document_type = self._resolve_document_type(path.name, document_type, auto_detect)
+            
+            extraction_start = time.time()
+            extracted_data = await self.mindee_service.extract_document_data_from_bytes_async(
+                data, path.name, document_type, client
+            )
+            
+            return analysis, document_type, extracted_data, time.time() - extraction_start
             
         except Exception as e:
             st.error(f"Erro no processamento: {str(e)}")
             raise
     
+    def _process_analyzed_document(
+        self,
+        analysis: Dict[str, Any],
+        extract: Callable[[str], Dict[str, Any]],
+        document_type: Optional[str],
+        auto_detect: bool,
+        start_time: float
+    ) -> ProcessedDocument:
+        """Executa extração e validação de um documento já analisado."""
+        
+        document_type = self._resolve_document_type(analysis['filename'], document_type, auto_detect)
+        
+        # Extração de dados com Mindee
+        extraction_start = time.time()
+        extracted_data = extract(document_type)
+        extraction_time = time.time() - extraction_start
+        
+        # Converte para modelo de dados
+        document_data = self._convert_to_document_data(extracted_data, analysis, extraction_time)
+        
+        # Validação com Groq
+        validation_start = time.time()
+        validation_result = self.validation_service.validate_document(
+            extracted_data, document_type, self._validation_cache
+        )
+        validation_time = time.time() - validation_start
+        
+        return self._build_processed_document(
+            analysis,
+            document_data,
+            validation_result,
+            validation_time,
+            start_time
+        )
+    
+    def _resolve_document_type(
+        self,
+        filename: str,
+        document_type: Optional[str],
+        auto_detect: bool
+    ) -> Optional[str]:
+        """Determina o tipo do documento."""
+        if auto_detect and not document_type:
+            document_type = FileProcessor.get_document_type_from_filename(filename)
+        
+        st.info(f"Processando documento: {filename} (Tipo: {document_type})")
+        
+        return document_type
+    
+    def _build_processed_document(
+        self,
+        analysis: Dict[str, Any],
+        document_data: DocumentData,
+        validation_result: Dict[str, Any],
+        validation_time: float,
+        start_time: float
+    ) -> ProcessedDocument:
+        """Combina os dados extraídos e a validação em ProcessedDocument."""
+        
+        # Converte para modelo de dados
+        validation_data = self._convert_to_validation_result(validation_result, validation_time)
+        
+        # Cria documento processado (sub-modelos já validados)
+        processed_doc = ProcessedDocument.model_construct(
+            document_data=document_data,
+            validation_result=validation_data,
+            file_name=analysis['filename'],
+            file_size=analysis['file_size']
+        )
+        
+        total_time = time.time() - start_time
+        st.success(f"Processamento concluído em {total_time:.2f}s")
+        
+        return processed_doc
+    
     def _convert_to_document_data(
         self, 
         extracted_data: Dict[str, Any], 
@@ -104,23 +465,17 @@ class DocumentProcessor:
         """Converte dados extraídos para modelo DocumentData."""
         
         # Converte campos extraídos
-        extracted_fields = {}
         raw_fields = extracted_data.get("extracted_fields", {})
+        extracted_fields = _EXTRACTED_FIELDS_ADAPTER.validate_python({
+            field_name: field_value if isinstance(field_value, dict) else {
+                "value": str(field_value) if field_value else None,
+                "confidence": 0.5  # Confiança padrão
+            }
+            for field_name, field_value in raw_fields.items()
+        })
         
-        for field_name, field_value in raw_fields.items():
-            if isinstance(field_value, dict):
-                extracted_fields[field_name] = ExtractedField(
-                    value=field_value.get("value"),
-                    confidence=field_value.get("confidence", 0.0),
-                    bounding_box=field_value.get("bounding_box")
-                )
-            else:
-                extracted_fields[field_name] = ExtractedField(
-                    value=str(field_value) if field_value else None,
-                    confidence=0.5  # Confiança padrão
-                )
-        
-        return DocumentData(
+        # Campos já validados acima; evita revalidar o modelo inteiro
+        return DocumentData.model_construct(
             document_type=DocumentType(extracted_data.get("document_type")),
             extracted_fields=extracted_fields,
             raw_response=extracted_data.get("raw_response", {}),
@@ -143,6 +498,7 @@ class DocumentProcessor:
             analysis=validation_data.get("analysis", ""),
             recommendations=validation_data.get("recommendations", []),
             validation_time=validation_time,
+            completed=validation_data.get("completed", True),
             cnh_specific_errors=validation_data.get("cnh_specific_errors", []),
             cnh_specific_warnings=validation_data.get("cnh_specific_warnings", []),
             rg_specific_errors=validation_data.get("rg_specific_errors", []),
@@ -190,4 +546,90 @@ class DocumentProcessor:
                 "total_time": (processed_doc.document_data.processing_time or 0) + 
                             (processed_doc.validation_result.validation_time or 0)
             }
-        } 
\ No newline at end of file
+        }
+
+
+class AsyncDocumentProcessor:
+    """Processa vários documentos concorrentemente usando um DocumentProcessor."""
+    
+    def __init__(self, processor: DocumentProcessor, max_concurrency: int = 4):
+        self.processor = processor
+        self.max_concurrency = max_concurrency
+    
+    async def process_one(
+        self,
+        document: DocumentSource,
+        semaphore: asyncio.Semaphore,
+        client: httpx.AsyncClient,
+        groq_client: AsyncGroq,
+        document_type: Optional[str] = None,
+        auto_detect: bool = True
+    ) -> ProcessedDocument:
+        """Processa um documento, respeitando o limite de concorrência."""
+        async with semaphore:
+            if isinstance(document, str):
+                return await self.processor.process_document_async(
+                    document, document_type, auto_detect, client=client, groq_client=groq_client
+                )
+            
+            data, filename = document
+            return await self.processor.process_document_bytes_async(
+                data, filename, document_type, auto_detect, client=client, groq_client=groq_client
+            )
+    
+    async def process_many(
+        self,
+        documents: List[DocumentSource],
+        document_type: Optional[str] = None,
+        auto_detect: bool = True,
+        on_complete: Optional[Callable[[int, int], None]] = None
+    ) -> List[Union[ProcessedDocument, Exception]]:
+        """
+        Processa documentos concorrentemente.
+        
+        As requisições ao Mindee e ao Groq compartilham, cada uma, um único cliente
+        com conexões keep-alive e timeout próprio, criado para esta execução.
+        
+        Args:
+            documents: Caminhos dos arquivos ou pares (conteúdo, nome do arquivo)
+            document_type: Tipo do documento (cnh, rg)
+            auto_detect: Se deve detectar automaticamente o tipo
+            on_complete: Callback chamado a cada documento concluído (concluídos, total)
+            
+        Returns:
+            Lista na mesma ordem de documents com o documento processado ou a exceção
+        """
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        total = len(documents)
+        completed = 0
+        
+        async with MindeeService.create_async_client() as client, \
+                self.processor.validation_service.create_async_groq_client() as groq_client:
+            
+            async def run(document: DocumentSource) -> ProcessedDocument:
+                nonlocal completed
+                try:
+                    return await self.process_one(
+                        document, semaphore, client, groq_client, document_type, auto_detect
+                    )
+                finally:
+                    completed += 1
+                    if on_complete:
+                        on_complete(completed, total)
+            
+            return await asyncio.gather(
+                *(run(document) for document in documents),
+                return_exceptions=True
+            )
+    
+    def process_documents(
+        self,
+        documents: List[DocumentSource],
+        document_type: Optional[str] = None,
+        auto_detect: bool = True,
+        on_complete: Optional[Callable[[int, int], None]] = None
+    ) -> List[Union[ProcessedDocument, Exception]]:
+        """Versão síncrona de process_many."""
+        return asyncio.run(
+            self.process_many(documents, document_type, auto_detect, on_complete)
+        )
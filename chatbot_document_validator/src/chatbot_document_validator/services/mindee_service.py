@@ -1,22 +1,128 @@
 """
 Serviço para integração com a API do Mindee para extração de dados de documentos.
 """
-import json
+import asyncio
+import logging
+import random
 import time
+import warnings
+import httpx
+import orjson
 import requests
+from requests.adapters import HTTPAdapter
+from requests_toolbelt.multipart.encoder import MultipartEncoder
+from urllib3.util.retry import Retry
 from pathlib import Path
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Tuple, Union, BinaryIO
 import streamlit as st
 
+from ..services.cache_service import ExtractionCache
+
+
+logger = logging.getLogger(__name__)
+
+
+# Endpoint de envio de documentos para inferência
+MINDEE_ENQUEUE_URL = "https://api-v2.mindee.net/v2/inferences/enqueue"
+
+# Polling: backoff exponencial com jitter, limitado por um tempo total de espera
+POLLING_BASE_DELAY = 0.5
+POLLING_MAX_DELAY = 4.0
+POLLING_JITTER = 0.2
+POLLING_TIMEOUT = 90.0
+
+# Status de job que não vão mais mudar
+MINDEE_FAILED_STATUSES = {"Failed", "Error"}
+
+# Mapeamento (campo interno, campo do Mindee) por tipo de documento
+FIELD_MAPS = {
+    "cnh": (
+        ("nome", "name"),
+        ("cpf", "cpf"),
+        ("categoria", "category"),
+        ("data_emissao", "issue_date"),
+        ("data_validade", "expiry_date"),
+        ("data_nascimento", "date_of_birth"),
+        ("numero_registro", "license_number"),
+        ("orgao_emissor", "issuing_authority"),
+        ("data_primeira_habilitacao", "first_habilitation_date"),
+    ),
+    "rg": (
+        ("nome", "name"),
+        ("numero_rg", "rg_number"),
+        ("cpf", "cpf_number"),
+        ("data_emissao", "issue_date"),
+        ("nome_pai", "fathers_name"),
+        ("nome_mae", "mothers_name"),
+        ("data_nascimento", "date_of_birth"),
+        ("local_nascimento", "place_of_birth"),
+        ("orgao_emissor", "issuing_authority"),
+    ),
+}
+
+
+def _field_value(field_data: Any) -> Optional[str]:
+    """Valor de um campo do Mindee: objetos trazem o valor em "value", demais tipos são o próprio valor."""
+    if isinstance(field_data, dict):
+        return field_data.get("value")
+    return field_data
+
+
+def _polling_delay(attempt: int, max_delay: float, retry_after: Optional[str] = None) -> float:
+    """Intervalo até a próxima verificação: Retry-After do servidor ou backoff exponencial."""
+    if retry_after:
+        try:
+            return max(0.0, float(retry_after))
+        except ValueError:
+            pass
+    return min(max_delay, POLLING_BASE_DELAY * 1.5 ** attempt) + random.uniform(0, POLLING_JITTER)
+
+
+def _legacy_polling_args(
+    timeout: float,
+    max_polling_interval: float,
+    max_retries: Optional[int],
+    polling_interval: Optional[float]
+) -> Tuple[float, float]:
+    """Converte max_retries/polling_interval (obsoletos) em timeout/max_polling_interval."""
+    if max_retries is None and polling_interval is None:
+        return timeout, max_polling_interval
+    
+    warnings.warn(
+        "max_retries e polling_interval estão obsoletos; use timeout e max_polling_interval",
+        DeprecationWarning,
+        stacklevel=3
+    )
+    if polling_interval is not None:
+        max_polling_interval = polling_interval
+    if max_retries is not None:
+        # Antes: max_retries verificações espaçadas de polling_interval segundos (padrão 2)
+        timeout = max_retries * (polling_interval if polling_interval is not None else 2)
+    return timeout, max_polling_interval
 
 
 class MindeeService:
     """Serviço para processamento de documentos usando a API do Mindee."""
     
-    def __init__(self, api_key: str):
+    def __init__(self, api_key: str, extraction_cache: Optional[ExtractionCache] = None):
         self.api_key = api_key
         self.headers = {"Authorization": api_key}
         
+        # Extrações já realizadas, por conteúdo do arquivo: reenvios idênticos não chamam a API
+        self.extraction_cache = extraction_cache if extraction_cache is not None else ExtractionCache()
+        
+        # Sessão persistente: reaproveita a conexão TLS entre envio, polling e resultado
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+        self.session.mount(
+            "https://",
+            HTTPAdapter(
+                pool_connections=4,
+                pool_maxsize=16,
+                max_retries=Retry(total=3, backoff_factor=0.5, status_forcelist=[502, 503, 504])
+            )
+        )
+        
         # Model IDs para diferentes tipos de documento
         self.model_ids = {
             "cnh": "6ac2f847-2eb9-434e-a2bc-8926d5777c5a",
@@ -27,8 +133,12 @@ class MindeeService:
         self,
         file_path: str,
         document_type: str,
-        max_retries: int = 30,
-        polling_interval: int = 2,
+        timeout: float = POLLING_TIMEOUT,
+        max_polling_interval: float = POLLING_MAX_DELAY,
+        filename: Optional[str] = None,
+        *,
+        max_retries: Optional[int] = None,
+        polling_interval: Optional[float] = None,
     ) -> Dict[str, Any]:
         """
         Envia arquivo para o Mindee e aguarda o processamento.
@@ -36,63 +146,130 @@ class MindeeService:
         Args:
             file_path: Caminho para o arquivo
             document_type: Tipo do documento (cnh, rg)
-            max_retries: Número máximo de tentativas de polling
-            polling_interval: Intervalo entre tentativas em segundos
+            timeout: Tempo máximo de espera pelo processamento em segundos
+            max_polling_interval: Intervalo máximo entre verificações em segundos
+            filename: Nome enviado ao Mindee; por padrão, o nome do arquivo em disco
+            max_retries: Obsoleto; equivale a timeout = max_retries * polling_interval
+            polling_interval: Obsoleto; equivale a max_polling_interval
             
         Returns:
             Dados extraídos do documento
         """
+        timeout, max_polling_interval = _legacy_polling_args(
+            timeout, max_polling_interval, max_retries, polling_interval
+        )
         upload_file = Path(file_path)
-        model_id = self.model_ids.get(document_type)
+        with upload_file.open("rb") as fh:
+            return self._send_with_polling(
+                filename or upload_file.name, fh, document_type, timeout, max_polling_interval
+            )
+    
+    def send_bytes_with_polling(
+        self,
+        data: bytes,
+        filename: str,
+        document_type: str,
+        timeout: float = POLLING_TIMEOUT,
+        max_polling_interval: float = POLLING_MAX_DELAY,
+    ) -> Dict[str, Any]:
+        """
+        Envia o conteúdo de um arquivo em memória para o Mindee e aguarda o processamento.
         
-        form_data = {"model_id": model_id, "rag": False}
+        Args:
+            data: Conteúdo do arquivo
+            filename: Nome do arquivo
+            document_type: Tipo do documento (cnh, rg)
+            timeout: Tempo máximo de espera pelo processamento em segundos
+            max_polling_interval: Intervalo máximo entre verificações em segundos
+            
+        Returns:
+            Dados extraídos do documento
+        """
+        return self._send_with_polling(
+            filename, data, document_type, timeout, max_polling_interval
+        )
+    
+    def _send_with_polling(
+        self,
+        filename: str,
+        content: Union[bytes, BinaryIO],
+        document_type: str,
+        timeout: float,
+        max_polling_interval: float,
+    ) -> Dict[str, Any]:
+        """Envia o conteúdo (bytes ou arquivo aberto) e faz o polling do resultado."""
+        model_id = self._model_id(document_type)
         
         try:
-            with upload_file.open("rb") as fh:
-                files = {"file": (upload_file.name, fh)}
-                st.info(f"Enviando arquivo: {upload_file.name}")
-                
-                response = requests.post(
-                    url="https://api-v2.mindee.net/v2/inferences/enqueue",
-                    files=files,
-                    data=form_data,
-                    headers=self.headers,
-                )
+            # O corpo multipart é gerado sob demanda: arquivos abertos vão do disco ao socket em blocos
+            encoder = MultipartEncoder(fields={
+                "model_id": model_id,
+                "rag": "false",
+                "file": (filename, content, "application/octet-stream"),
+            })
+            st.info(f"Enviando arquivo: {filename}")
+            
+            response = self.session.post(
+                url=MINDEE_ENQUEUE_URL,
+                data=encoder,
+                headers={"Content-Type": encoder.content_type},
+            )
             
             response.raise_for_status()
-            job_data = response.json().get("job")
+            job_data = orjson.loads(response.content).get("job")
             polling_url = job_data.get("polling_url")
             
+            deadline = time.monotonic() + timeout
+            
             # Aguarda antes de começar o polling
-            time.sleep(3)
+            time.sleep(_polling_delay(0, max_polling_interval))
             
             # Polling para verificar conclusão
             with st.spinner("Processando documento..."):
-                for attempt in range(max_retries):
-                    st.info(f"Verificando status... (tentativa {attempt + 1}/{max_retries})")
+                attempt = 0
+                while True:
+                    attempt += 1
+                    st.info(f"Verificando status... (tentativa {attempt})")
+                    
+                    # Job concluído redireciona para o resultado: segue o redirecionamento na mesma ida
+                    poll_response = self.session.get(polling_url)
                     
-                    poll_response = requests.get(
-                        polling_url, 
-                        headers=self.headers, 
-                        allow_redirects=False
-                    )
-                    poll_data = poll_response.json()
+                    if poll_response.history:
+                        # Redirecionamento para outro host descarta a autenticação: refaz a busca com ela
+                        if not poll_response.ok:
+                            poll_response = self.session.get(poll_response.url, headers=self.headers)
+                            poll_response.raise_for_status()
+                        
+                        st.success("Documento processado com sucesso!")
+                        result_data = orjson.loads(poll_response.content)
+                        logger.debug("Resultado do Mindee: %s", result_data)
+                        return result_data
+                    
+                    poll_data = orjson.loads(poll_response.content)
                     job_status = poll_data.get("job", {}).get("status")
                     
-                    if poll_response.status_code == 302 or job_status == "Processed":
+                    if job_status == "Processed":
                         result_url = poll_data.get("job", {}).get("result_url")
                         st.success("Documento processado com sucesso!")
                         
-                        result_response = requests.get(result_url, headers=self.headers)
-                        result_data = result_response.json()
-                        print(result_data)
+                        result_response = self.session.get(result_url)
+                        result_data = orjson.loads(result_response.content)
+                        logger.debug("Resultado do Mindee: %s", result_data)
                         return result_data
                     
+                    if job_status in MINDEE_FAILED_STATUSES:
+                        raise RuntimeError(f"Processamento no Mindee falhou (status {job_status})")
+                    
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    
                     # Ainda processando, aguarda antes da próxima tentativa
-                    time.sleep(polling_interval)
+                    delay = _polling_delay(attempt, max_polling_interval, poll_response.headers.get("Retry-After"))
+                    time.sleep(min(delay, remaining))
             
-            # Se esgotou todas as tentativas
-            raise TimeoutError(f"Timeout após {max_retries} tentativas")
+            # Se esgotou o tempo de espera
+            raise TimeoutError(f"Timeout após {timeout:.0f}s aguardando o Mindee")
             
         except requests.exceptions.RequestException as e:
             st.error(f"Erro na comunicação com Mindee: {str(e)}")
@@ -101,19 +278,200 @@ class MindeeService:
             st.error(f"Erro inesperado: {str(e)}")
             raise
     
-    def extract_document_data(self, file_path: str, document_type: str) -> Dict[str, Any]:
+    def _model_id(self, document_type: str) -> str:
+        """Model ID do Mindee para o tipo de documento; falha antes do envio se o tipo não for suportado."""
+        model_id = self.model_ids.get(document_type)
+        if model_id is None:
+            supported = ", ".join(sorted(self.model_ids))
+            raise ValueError(f"Tipo de documento não suportado: {document_type}. Suportados: {supported}")
+        return model_id
+    
+    @staticmethod
+    def create_async_client() -> httpx.AsyncClient:
+        """
+        Cria um cliente HTTP assíncrono com pool de conexões keep-alive.
+        
+        Com HTTP/2, os envios e pollings concorrentes são multiplexados na mesma conexão.
+        """
+        return httpx.AsyncClient(
+            http2=True,
+            timeout=30,
+            limits=httpx.Limits(max_keepalive_connections=32, max_connections=64)
+        )
+    
+    async def send_bytes_with_polling_async(
+        self,
+        data: bytes,
+        filename: str,
+        document_type: str,
+        client: httpx.AsyncClient,
+        timeout: float = POLLING_TIMEOUT,
+        max_polling_interval: float = POLLING_MAX_DELAY,
+    ) -> Dict[str, Any]:
+        """
+        Versão assíncrona de send_bytes_with_polling.
+        
+        Args:
+            data: Conteúdo do arquivo
+            filename: Nome do arquivo
+            document_type: Tipo do documento (cnh, rg)
+            client: Cliente HTTP compartilhado (ver create_async_client)
+            timeout: Tempo máximo de espera pelo processamento em segundos
+            max_polling_interval: Intervalo máximo entre verificações em segundos
+            
+        Returns:
+            Dados extraídos do documento
+        """
+        model_id = self._model_id(document_type)
+        
+        form_data = {"model_id": model_id, "rag": False}
+        
+        try:
+            st.info(f"Enviando arquivo: {filename}")
+            
+            response = await client.post(
+                MINDEE_ENQUEUE_URL,
+                files={"file": (filename, data)},
+                data=form_data,
+                headers=self.headers,
+            )
+            
+            response.raise_for_status()
+            job_data = orjson.loads(response.content).get("job")
+            polling_url = job_data.get("polling_url")
+            
+            deadline = time.monotonic() + timeout
+            
+            # Aguarda antes de começar o polling, liberando o event loop
+            await asyncio.sleep(_polling_delay(0, max_polling_interval))
+            
+            # Polling para verificar conclusão
+            attempt = 0
+            while True:
+                attempt += 1
+                st.info(f"Verificando status de {filename}... (tentativa {attempt})")
+                
+                # Job concluído redireciona para o resultado: segue o redirecionamento na mesma ida
+                poll_response = await client.get(
+                    polling_url,
+                    headers=self.headers,
+                    follow_redirects=True
+                )
+                
+                if poll_response.history:
+                    # Redirecionamento para outro host descarta a autenticação: refaz a busca com ela
+                    if not poll_response.is_success:
+                        poll_response = await client.get(poll_response.url, headers=self.headers)
+                        poll_response.raise_for_status()
+                    
+                    st.success(f"Documento {filename} processado com sucesso!")
+                    return orjson.loads(poll_response.content)
+                
+                poll_data = orjson.loads(poll_response.content)
+                job_status = poll_data.get("job", {}).get("status")
+                
+                if job_status == "Processed":
+                    result_url = poll_data.get("job", {}).get("result_url")
+                    st.success(f"Documento {filename} processado com sucesso!")
+                    
+                    result_response = await client.get(result_url, headers=self.headers)
+                    return orjson.loads(result_response.content)
+                
+                if job_status in MINDEE_FAILED_STATUSES:
+                    raise RuntimeError(f"Processamento no Mindee falhou (status {job_status})")
+                
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                
+                # Ainda processando, aguarda antes da próxima tentativa
+                delay = _polling_delay(attempt, max_polling_interval, poll_response.headers.get("Retry-After"))
+                await asyncio.sleep(min(delay, remaining))
+            
+            # Se esgotou o tempo de espera
+            raise TimeoutError(f"Timeout após {timeout:.0f}s aguardando o Mindee")
+            
+        except httpx.HTTPError as e:
+            st.error(f"Erro na comunicação com Mindee: {str(e)}")
+            raise
+        except Exception as e:
+            st.error(f"Erro inesperado: {str(e)}")
+            raise
+    
+    def extract_document_data(
+        self,
+        file_path: str,
+        document_type: str,
+        filename: Optional[str] = None
+    ) -> Dict[str, Any]:
         """
         Extrai dados do documento usando o Mindee.
         
         Args:
             file_path: Caminho para o arquivo
             document_type: Tipo do documento
+            filename: Nome original do arquivo, se diferente do nome em disco
+            
+        Returns:
+            Dados extraídos e estruturados
+        """
+        cache_key = ExtractionCache.make_file_key(file_path, document_type or "")
+        cached = self.extraction_cache.get(cache_key)
+        if cached is not None:
+            return cached
+        
+        raw_data = self.send_file_with_polling(file_path, document_type, filename=filename)
+        return self._structure_and_cache(cache_key, raw_data, document_type)
+    
+    def extract_document_data_from_bytes(
+        self,
+        data: bytes,
+        filename: str,
+        document_type: str
+    ) -> Dict[str, Any]:
+        """
+        Extrai dados de um documento em memória usando o Mindee.
+        
+        Args:
+            data: Conteúdo do arquivo
+            filename: Nome do arquivo
+            document_type: Tipo do documento
             
         Returns:
             Dados extraídos e estruturados
         """
-        raw_data = self.send_file_with_polling(file_path, document_type)
-        # Estrutura os dados extraídos
+        cache_key = ExtractionCache.make_key(data, document_type or "")
+        cached = self.extraction_cache.get(cache_key)
+        if cached is not None:
+            return cached
+        
+        raw_data = self.send_bytes_with_polling(data, filename, document_type)
+        return self._structure_and_cache(cache_key, raw_data, document_type)
+    
+    async def extract_document_data_from_bytes_async(
+        self,
+        data: bytes,
+        filename: str,
+        document_type: str,
+        client: httpx.AsyncClient
+    ) -> Dict[str, Any]:
+        """Versão assíncrona de extract_document_data_from_bytes."""
+        cache_key = ExtractionCache.make_key(data, document_type or "")
+        cached = self.extraction_cache.get(cache_key)
+        if cached is not None:
+            return cached
+        
+        raw_data = await self.send_bytes_with_polling_async(data, filename, document_type, client)
+        return self._structure_and_cache(cache_key, raw_data, document_type)
+    
+    def _structure_and_cache(self, cache_key: str, raw_data: Dict[str, Any], document_type: str) -> Dict[str, Any]:
+        """Estrutura a resposta do Mindee e guarda o resultado no cache de extrações."""
+        extracted_data = self._structure_extracted_data(raw_data, document_type)
+        self.extraction_cache.put(cache_key, extracted_data)
+        return extracted_data
+    
+    def _structure_extracted_data(self, raw_data: Dict[str, Any], document_type: str) -> Dict[str, Any]:
+        """Estrutura a resposta bruta do Mindee."""
         extracted_data = {
             "raw_response": raw_data,
             "document_type": document_type,
@@ -122,62 +480,32 @@ class MindeeService:
         }
         
         # Extrai campos específicos baseado no tipo de documento
-        if document_type == "cnh":
-            extracted_data.update(self._extract_cnh_fields(raw_data))
-        elif document_type == "rg":
-            extracted_data.update(self._extract_rg_fields(raw_data))
+        if document_type in FIELD_MAPS:
+            extracted_data.update(self._extract_fields(raw_data, document_type))
         
         return extracted_data
     
-    def _extract_cnh_fields(self, raw_data: Dict[str, Any]) -> Dict[str, Any]:
-        """Extrai campos específicos da CNH."""
+    def _extract_fields(self, raw_data: Dict[str, Any], document_type: str) -> Dict[str, Any]:
+        """Extrai os campos do tipo de documento conforme FIELD_MAPS."""
         fields = {}
         try:
-            # Corrigir caminho para os campos extraídos
-            fields_data = raw_data.get('inference', {}).get('result', {}).get('fields', {})
-            fields.update({
-                "nome": self._get_field_value(fields_data, "name"),
-                "cpf": self._get_field_value(fields_data, "cpf"),
-                "categoria": self._get_field_value(fields_data, "category"),
-                "data_emissao": self._get_field_value(fields_data, "issue_date"),
-                "data_validade": self._get_field_value(fields_data, "expiry_date"),
-                "data_nascimento": self._get_field_value(fields_data, "date_of_birth"),
-                "numero_registro": self._get_field_value(fields_data, "license_number"),
-                "orgao_emissor": self._get_field_value(fields_data, "issuing_authority"),
-                "data_primeira_habilitacao": self._get_field_value(fields_data, "first_habilitation_date")
-            })
+            fields_data = raw_data.get('inference', {}).get('result', {}).get('fields') or {}
+            fields = {
+                field: _field_value(fields_data.get(mindee_field))
+                for field, mindee_field in FIELD_MAPS[document_type]
+            }
         except Exception as e:
-            st.warning(f"Erro ao extrair campos da CNH: {str(e)}")
+            st.warning(f"Erro ao extrair campos do documento ({document_type}): {str(e)}")
         return {"extracted_fields": fields}
     
+    def _extract_cnh_fields(self, raw_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Extrai campos específicos da CNH."""
+        return self._extract_fields(raw_data, "cnh")
+    
     def _extract_rg_fields(self, raw_data: Dict[str, Any]) -> Dict[str, Any]:
         """Extrai campos específicos do RG."""
-        fields = {}
-        try:
-            # Corrigir caminho para os campos extraídos
-            fields_data = raw_data.get('inference', {}).get('result', {}).get('fields', {})
-            fields.update({
-                "nome": self._get_field_value(fields_data, "name"),
-                "numero_rg": self._get_field_value(fields_data, "rg_number"),
-                "cpf": self._get_field_value(fields_data, "cpf_number"),
-                "data_emissao": self._get_field_value(fields_data, "issue_date"),
-                "nome_pai": self._get_field_value(fields_data, "fathers_name"),
-                "nome_mae": self._get_field_value(fields_data, "mothers_name"),
-                "data_nascimento": self._get_field_value(fields_data, "date_of_birth"),
-                "local_nascimento": self._get_field_value(fields_data, "place_of_birth"),
-                "orgao_emissor": self._get_field_value(fields_data, "issuing_authority")
-            })
-        except Exception as e:
-            st.warning(f"Erro ao extrair campos do RG: {str(e)}")
-        return {"extracted_fields": fields}
+        return self._extract_fields(raw_data, "rg")
     
     def _get_field_value(self, predictions: Dict[str, Any], field_name: str) -> Optional[str]:
         """Extrai valor de um campo específico das predições."""
-        try:
-            field_data = predictions.get(field_name, {})
-            if isinstance(field_data, dict):
-                return field_data.get("value")
-            return None 
-        except Exception as e:
-            st.warning(f"Erro ao extrair campo {field_name}: {str(e)}")
-            return None
+        return _field_value(predictions.get(field_name))
\ No newline at end of file
@@ -1,46 +1,282 @@
 """
 Serviço de validação de documentos usando Groq LLM.
 """
-import json
-from typing import Dict, Any, List, Optional
-from groq import Groq
+import asyncio
+import hashlib
+import httpx
+import orjson
+import time
+from typing import Dict, Any, List, Optional, Tuple
+from groq import AsyncGroq, Groq
 import streamlit as st
 from datetime import datetime, date
 import re
-import validate_docbr
+
+from ..services.cache_service import LRUCache, ValidationCache
+
+
+# Versão dos prompts; altere ao modificá-los para invalidar respostas em cache
+PROMPT_VERSION = "v2"
+
+# Respostas do Groq só são reaproveitadas com temperatura baixa (saída praticamente determinística)
+MAX_CACHEABLE_TEMPERATURE = 0.1
+
+# Número de respostas do Groq mantidas em cache
+GROQ_RESPONSE_CACHE_SIZE = 1024
+
+# Polling da Batch API: intervalo inicial dobrando a cada verificação até o máximo
+BATCH_POLLING_BASE_DELAY = 2.0
+BATCH_POLLING_MAX_DELAY = 60.0
+# Mesmo prazo do completion_window do lote; depois disso o Groq o expira
+BATCH_POLLING_TIMEOUT = 24 * 60 * 60.0
+
+# Modelos do Groq por nível de velocidade; documentos limpos usam o modelo instantâneo
+MODEL_TIERS = {
+    "instant": "llama-3.1-8b-instant",
+    "balanced": "llama-3.3-70b-versatile"
+}
+
+# Campos que devem estar presentes para o documento usar o modelo instantâneo
+REQUIRED_FIELDS = {
+    "cnh": ("nome", "cpf", "numero_registro", "data_nascimento", "data_emissao", "data_validade", "data_primeira_habilitacao"),
+    "rg": ("nome", "numero_rg", "data_nascimento", "data_emissao")
+}
+
+# Campos de data convertidos no pré-processamento de cada tipo de documento
+DATE_FIELDS = {
+    "cnh": ("data_nascimento", "data_emissao", "data_validade", "data_primeira_habilitacao"),
+    "rg": ("data_nascimento", "data_emissao")
+}
+
+# Comparações de datas que, se falsas, invalidam o documento sem consultar o Groq
+DATE_COMPARISON_ERRORS = {
+    "nascimento_anterior_emissao": "Data de nascimento posterior à data de emissão",
+    "emissao_anterior_validade": "Data de emissão posterior à data de validade",
+    "primeira_hab_anterior_emissao": "Primeira habilitação posterior à data de emissão"
+}
+
+# Instruções fixas enviadas na mensagem de sistema; a mensagem do usuário leva só os dados
+_SYSTEM_PROMPT_TEMPLATE = (
+    "Você é um especialista em validação de documentos brasileiros e recebe em JSON os dados "
+    "pré-processados de {documento}. Use apenas esses dados e os campos já calculados (idades, "
+    "comparacoes_datas), sem comparar datas manualmente. Campos obrigatórios: {obrigatorios}. "
+    "Regras: {regras}. Responda somente em JSON válido: "
+    '{{"is_valid": true/false, "confidence": 0.0-1.0, "errors": ["erros críticos"], '
+    '"warnings": ["avisos"], "analysis": "análise detalhada", "recommendations": ["recomendações"]}}'
+)
+
+SYSTEM_PROMPTS = {
+    "cnh": _SYSTEM_PROMPT_TEMPLATE.format(
+        documento="uma CNH",
+        obrigatorios=", ".join(REQUIRED_FIELDS["cnh"]),
+        regras=(
+            "todas as comparacoes_datas devem ser true; idade_na_emissao ≥ 18; periodo_validade_anos "
+            "deve ser 3, 4 ou 5; dias_para_vencimento negativo indica CNH vencida; CPF no formato "
+            "XXX.XXX.XXX-XX (11 dígitos); numero_registro com 11 dígitos; categoria pode estar vazia "
+            "(erro de extração)"
+        )
+    ),
+    "rg": _SYSTEM_PROMPT_TEMPLATE.format(
+        documento="um RG",
+        obrigatorios=", ".join(REQUIRED_FIELDS["rg"]),
+        regras=(
+            "comparacoes_datas.nascimento_anterior_emissao deve ser true; idade_na_emissao ≥ 0 (pode "
+            "ser emitido para recém-nascidos); CPF, se presente, no formato XXX.XXX.XXX-XX; numero_rg "
+            "em formato válido para o estado; órgão emissor válido (SSP, DETRAN etc.) com UF válida e "
+            "coerente com o local de nascimento"
+        )
+    )
+}
+
+DEFAULT_SYSTEM_PROMPT = "Você é um especialista em validação de documentos brasileiros. Sempre responda em JSON válido."
+
+# Validações concorrentes: requisições simultâneas e pool keep-alive do cliente assíncrono
+GROQ_MAX_CONCURRENCY = 8
+GROQ_MAX_KEEPALIVE_CONNECTIONS = 10
+GROQ_MAX_CONNECTIONS = 20
+
+# Tempo máximo de uma chamada ao Groq em segundos; respostas em streaming podem demorar
+GROQ_TIMEOUT = 120.0
+
+
+# Padrões pré-compilados usados pelos validadores
+_NON_DIGIT_RE = re.compile(r'[^0-9]')
+_NON_ALNUM_RE = re.compile(r'[^a-zA-Z0-9]')
+
+# Pontuação comum em documentos, removida em uma única passada com str.translate
+_STRIP_PUNCT = str.maketrans("", "", ".-/ \t")
+
+# Categorias válidas de CNH no Brasil
+_CNH_CATEGORIES = frozenset({"A", "B", "C", "D", "E", "AB", "AC", "AD", "AE", "ACC"})
+
+# Pesos dos dígitos verificadores do CPF
+_CPF_DV1_WEIGHTS = tuple(range(10, 1, -1))
+_CPF_DV2_WEIGHTS = tuple(range(11, 1, -1))
+
+
+def _cpf_digits(cpf: str) -> str:
+    """Extrai os dígitos do CPF, com caminho rápido para o formato XXX.XXX.XXX-XX."""
+    if len(cpf) == 14 and cpf[3] == '.' and cpf[7] == '.' and cpf[11] == '-':
+        digits = cpf[0:3] + cpf[4:7] + cpf[8:11] + cpf[12:14]
+        if digits.isascii() and digits.isdigit():
+            return digits
+    return _only_digits(cpf)
+
+
+def _only_digits(value: str) -> str:
+    """Remove caracteres não numéricos, sem custo quando o valor já contém só dígitos."""
+    if value.isascii() and value.isdigit():
+        return value
+    
+    # Caso comum: apenas pontuação de formatação (ex.: 074.508.831-17)
+    stripped = value.translate(_STRIP_PUNCT)
+    if stripped.isascii() and stripped.isdigit():
+        return stripped
+    return _NON_DIGIT_RE.sub('', value)
+
+
+def _only_alnum(value: str) -> str:
+    """Remove caracteres não alfanuméricos, evitando a regex no formato usual (ex.: 4.021.923 - ES)."""
+    stripped = value.translate(_STRIP_PUNCT)
+    if stripped.isascii() and stripped.isalnum():
+        return stripped
+    return _NON_ALNUM_RE.sub('', value)
+
+
+def _cpf_check_digits_ok(cpf_digits: str) -> bool:
+    """Confere os dígitos verificadores de um CPF com exatamente 11 dígitos."""
+    digits = [ord(c) - 48 for c in cpf_digits]
+    dv1 = sum(d * w for d, w in zip(digits, _CPF_DV1_WEIGHTS)) * 10 % 11 % 10
+    dv2 = sum(d * w for d, w in zip(digits, _CPF_DV2_WEIGHTS)) * 10 % 11 % 10
+    return digits[9] == dv1 and digits[10] == dv2
+
+
+def _parse_iso_date(date_str: str) -> Optional[date]:
+    """Converte uma data yyyy-mm-dd, com caminho rápido para o formato ISO completo."""
+    if len(date_str) == 10 and date_str[4] == '-' and date_str[7] == '-':
+        try:
+            return date.fromisoformat(date_str)
+        except ValueError:
+            return None
+    
+    # Formatos sem zeros à esquerda (ex.: 2025-1-5)
+    try:
+        return datetime.strptime(date_str, "%Y-%m-%d").date()
+    except ValueError:
+        return None
+
+
+def _parse_date(value: str) -> Optional[datetime]:
+    """Converte uma data yyyy-mm-dd ou dd/mm/yyyy escolhendo o formato pelo separador."""
+    if len(value) == 10 and value[4] == '-' and value[7] == '-':
+        try:
+            return datetime.fromisoformat(value)
+        except ValueError:
+            return None
+    
+    # Formato brasileiro ou ISO sem zeros à esquerda (ex.: 2025-1-5)
+    date_format = '%d/%m/%Y' if '/' in value else '%Y-%m-%d'
+    try:
+        return datetime.strptime(value, date_format)
+    except ValueError:
+        return None
+
+
+def _parse_dates(fields: Dict[str, Any], names: Tuple[str, ...]) -> Dict[str, Optional[datetime]]:
+    """Converte uma única vez as datas preenchidas, para o pré-processamento e as validações específicas."""
+    return {name: _parse_date(str(fields[name]).strip()) for name in names if fields.get(name)}
+
+
+class _JsonObjectCollector:
+    """Acumula a resposta em streaming e detecta o fim do primeiro objeto JSON."""
+    
+    def __init__(self):
+        self.parts: List[str] = []
+        self.json_parts: List[str] = []
+        self.depth = 0
+        self.in_string = False
+        self.escaped = False
+        self.complete = False
+    
+    def feed(self, text: str) -> bool:
+        """Adiciona um trecho; retorna True quando o objeto JSON se fecha."""
+        self.parts.append(text)
+        start = 0
+        for index, char in enumerate(text):
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif char == '\\':
+                    self.escaped = True
+                elif char == '"':
+                    self.in_string = False
+            elif char == '{':
+                if self.depth == 0:
+                    start = index
+                self.depth += 1
+            elif char == '}' and self.depth:
+                self.depth -= 1
+                if self.depth == 0:
+                    self.json_parts.append(text[start:index + 1])
+                    self.complete = True
+                    return True
+            elif char == '"' and self.depth:
+                self.in_string = True
+        
+        if self.depth:
+            self.json_parts.append(text[start:])
+        return False
+    
+    @property
+    def content(self) -> str:
+        """O objeto JSON completo ou, se ele não se fechou, todo o texto recebido."""
+        return "".join(self.json_parts if self.complete else self.parts)
+    
+    def is_json_object(self) -> bool:
+        """Indica se a resposta trouxe um objeto JSON completo e válido."""
+        if not self.complete:
+            return False
+        try:
+            return isinstance(orjson.loads(self.content), dict)
+        except orjson.JSONDecodeError:
+            return False
+
 
 class DocumentValidationService:
     """Serviço para validação de documentos usando Groq LLM."""
     
-    def __init__(self, groq_api_key: str):
+    def __init__(self, groq_api_key: str, validation_cache: Optional[ValidationCache] = None):
         self.client = Groq(api_key=groq_api_key)
-        self.model = "llama-3.3-70b-versatile"
+        self.api_key = groq_api_key
+        self.model = MODEL_TIERS["balanced"]
+        self.temperature = 0.1  # Temperatura baixa para mais consistência
+        self.validation_cache = validation_cache
+        self.response_cache = LRUCache(max_size=GROQ_RESPONSE_CACHE_SIZE)
     
-    def preprocess_cnh_data(self, fields: Dict[str, Any]) -> Dict[str, Any]:
+    def preprocess_cnh_data(
+        self,
+        fields: Dict[str, Any],
+        now: Optional[datetime] = None,
+        dates: Optional[Dict[str, Optional[datetime]]] = None
+    ) -> Dict[str, Any]:
         """
         Pré-processa os dados da CNH para facilitar a validação
+        
+        Args:
+            fields: Campos extraídos
+            now: Instante de referência; lotes passam o mesmo valor para todos os documentos
+            dates: Datas já convertidas (ver _parse_dates)
         """
+        now = now or datetime.now()
         processed = fields.copy()
         
         # Converter datas para objetos datetime e calcular informações úteis
-        date_fields = ['data_nascimento', 'data_emissao', 'data_validade', 'data_primeira_habilitacao']
-        dates = {}
-        
-        for field in date_fields:
-            if processed.get(field):
-                try:
-                    # Tentar formato ISO primeiro
-                    dates[field] = datetime.strptime(processed[field], '%Y-%m-%d')
-                except ValueError:
-                    try:
-                        # Tentar formato brasileiro
-                        dates[field] = datetime.strptime(processed[field], '%d/%m/%Y')
-                    except ValueError:
-                        dates[field] = None
+        if dates is None:
+            dates = _parse_dates(fields, DATE_FIELDS["cnh"])
         
         # Calcular idade atual
         if dates.get('data_nascimento'):
-            idade_atual = (datetime.now() - dates['data_nascimento']).days // 365
+            idade_atual = (now - dates['data_nascimento']).days // 365
             processed['idade_atual'] = idade_atual
         
         # Calcular idade na emissão
@@ -50,7 +286,7 @@ class DocumentValidationService:
         
         # Verificar se CNH está vencida
         if dates.get('data_validade'):
-            dias_vencimento = (dates['data_validade'] - datetime.now()).days
+            dias_vencimento = (dates['data_validade'] - now).days
             processed['dias_para_vencimento'] = dias_vencimento
             processed['esta_vencida'] = dias_vencimento < 0
         
@@ -74,31 +310,30 @@ class DocumentValidationService:
         
         return processed
     
-    def preprocess_rg_data(self, fields: Dict[str, Any]) -> Dict[str, Any]:
+    def preprocess_rg_data(
+        self,
+        fields: Dict[str, Any],
+        now: Optional[datetime] = None,
+        dates: Optional[Dict[str, Optional[datetime]]] = None
+    ) -> Dict[str, Any]:
         """
         Pré-processa os dados do RG para facilitar a validação
+        
+        Args:
+            fields: Campos extraídos
+            now: Instante de referência; lotes passam o mesmo valor para todos os documentos
+            dates: Datas já convertidas (ver _parse_dates)
         """
+        now = now or datetime.now()
         processed = fields.copy()
         
         # Converter datas para objetos datetime
-        date_fields = ['data_nascimento', 'data_emissao']
-        dates = {}
-        
-        for field in date_fields:
-            if processed.get(field):
-                try:
-                    # Tentar formato ISO primeiro
-                    dates[field] = datetime.strptime(processed[field], '%Y-%m-%d')
-                except ValueError:
-                    try:
-                        # Tentar formato brasileiro
-                        dates[field] = datetime.strptime(processed[field], '%d/%m/%Y')
-                    except ValueError:
-                        dates[field] = None
+        if dates is None:
+            dates = _parse_dates(fields, DATE_FIELDS["rg"])
         
         # Calcular idade atual
         if dates.get('data_nascimento'):
-            idade_atual = (datetime.now() - dates['data_nascimento']).days // 365
+            idade_atual = (now - dates['data_nascimento']).days // 365
             processed['idade_atual'] = idade_atual
         
         # Calcular idade na emissão
@@ -115,22 +350,48 @@ class DocumentValidationService:
         
         return processed
     
-    def validate_document(self, document_data: Dict[str, Any], document_type: str) -> Dict[str, Any]:
+    def validate_document(
+        self,
+        document_data: Dict[str, Any],
+        document_type: str,
+        validation_cache: Optional[ValidationCache] = None
+    ) -> Dict[str, Any]:
         """
         Valida um documento usando Groq LLM.
         
         Args:
             document_data: Dados extraídos do documento
             document_type: Tipo do documento (cnh, rg)
+            validation_cache: Cache de validações da sessão; usa o do serviço se omitido
             
         Returns:
             Resultado da validação
         """
         try:
+            # Campos idênticos já validados reutilizam o resultado anterior
+            if validation_cache is None:
+                validation_cache = self.validation_cache
+            
+            cache_key = None
+            if validation_cache is not None:
+                cache_key = ValidationCache.make_key(
+                    document_data.get("extracted_fields", {}), document_type
+                )
+                cached_result = validation_cache.get(cache_key)
+                if cached_result is not None:
+                    return cached_result
+            
+            result = None
             if document_type == "cnh":
-                return self._validate_cnh(document_data)
+                result = self._validate_cnh(document_data)
             elif document_type == "rg":
-                return self._validate_rg(document_data)
+                result = self._validate_rg(document_data)
+            
+            # Respostas do Groq que não puderam ser interpretadas não são reaproveitadas
+            if result is not None and cache_key is not None and result.get("completed", True):
+                validation_cache.put(cache_key, result)
+            
+            return result
                 
         except Exception as e:
             st.error(f"Erro na validação: {str(e)}")
@@ -138,179 +399,527 @@ class DocumentValidationService:
                 "is_valid": False,
                 "errors": [f"Erro na validação: {str(e)}"],
                 "warnings": [],
-                "confidence": 0.0
+                "confidence": 0.0,
+                "completed": False
+            }
+    
+    async def validate_document_async(
+        self,
+        document_data: Dict[str, Any],
+        document_type: str,
+        aclient: AsyncGroq,
+        validation_cache: Optional[ValidationCache] = None
+    ) -> Dict[str, Any]:
+        """
+        Versão assíncrona de validate_document.
+        
+        Args:
+            document_data: Dados extraídos do documento
+            document_type: Tipo do documento (cnh, rg)
+            aclient: Cliente assíncrono do Groq compartilhado (ver create_async_groq_client)
+            validation_cache: Cache de validações da sessão; usa o do serviço se omitido
+            
+        Returns:
+            Resultado da validação
+        """
+        try:
+            if validation_cache is None:
+                validation_cache = self.validation_cache
+            
+            cache_key = None
+            if validation_cache is not None:
+                cache_key = ValidationCache.make_key(
+                    document_data.get("extracted_fields", {}), document_type
+                )
+                cached_result = validation_cache.get(cache_key)
+                if cached_result is not None:
+                    return cached_result
+            
+            prepared = self._prepare_validation(document_data.get("extracted_fields", {}), document_type)
+            if prepared is None:
+                return None
+            
+            prompt, model, specific_result, rejection = prepared
+            if rejection is not None:
+                result = rejection
+            else:
+                response = await self._acall_groq(prompt, aclient, model=model, document_type=document_type)
+                result = self._parse_validation_response(response)
+                result.update(specific_result)
+            
+            if cache_key is not None and result.get("completed", True):
+                validation_cache.put(cache_key, result)
+            
+            return result
+            
+        except Exception as e:
+            st.error(f"Erro na validação: {str(e)}")
+            return {
+                "is_valid": False,
+                "errors": [f"Erro na validação: {str(e)}"],
+                "warnings": [],
+                "confidence": 0.0,
+                "completed": False
             }
     
+    async def validate_many(
+        self,
+        documents: List[Tuple[Dict[str, Any], str]],
+        max_concurrency: int = GROQ_MAX_CONCURRENCY
+    ) -> List[Dict[str, Any]]:
+        """
+        Valida vários documentos com chamadas simultâneas ao Groq.
+        
+        As requisições compartilham o pool keep-alive de um único cliente HTTP, sem
+        novos handshakes TLS; o semáforo limita quantas ficam em andamento.
+        
+        Args:
+            documents: Pares (dados extraídos, tipo do documento)
+            max_concurrency: Número máximo de validações simultâneas
+            
+        Returns:
+            Resultados de validação na mesma ordem de documents
+        """
+        semaphore = asyncio.Semaphore(max_concurrency)
+        
+        async with self.create_async_groq_client() as aclient:
+            
+            async def bounded(document_data: Dict[str, Any], document_type: str) -> Dict[str, Any]:
+                async with semaphore:
+                    return await self.validate_document_async(document_data, document_type, aclient)
+            
+            return await asyncio.gather(
+                *(bounded(document_data, document_type) for document_data, document_type in documents)
+            )
+    
+    @staticmethod
+    def create_async_client() -> httpx.AsyncClient:
+        """Cria um cliente HTTP assíncrono com pool de conexões keep-alive para o Groq."""
+        return httpx.AsyncClient(
+            timeout=GROQ_TIMEOUT,
+            limits=httpx.Limits(
+                max_keepalive_connections=GROQ_MAX_KEEPALIVE_CONNECTIONS,
+                max_connections=GROQ_MAX_CONNECTIONS
+            )
+        )
+    
+    def create_async_groq_client(self) -> AsyncGroq:
+        """
+        Cria o cliente assíncrono do Groq, com pool e timeout próprios.
+        
+        Deve ser criado uma vez por execução do event loop (asyncio.run) e usado como
+        gerenciador de contexto assíncrono, que fecha as conexões ao final.
+        """
+        return AsyncGroq(
+            api_key=self.api_key,
+            timeout=GROQ_TIMEOUT,
+            http_client=self.create_async_client()
+        )
+    
+    def validate_documents_batch(
+        self,
+        documents: List[Tuple[Dict[str, Any], str]],
+        max_polling_interval: float = BATCH_POLLING_MAX_DELAY,
+        timeout: float = BATCH_POLLING_TIMEOUT
+    ) -> List[Dict[str, Any]]:
+        """
+        Valida vários documentos em uma única requisição à Batch API do Groq.
+        
+        O custo é menor que o de chamadas individuais, mas o resultado pode levar
+        horas; use apenas em execuções offline. O caminho interativo continua
+        sendo validate_document.
+        
+        Args:
+            documents: Pares (dados extraídos, tipo do documento)
+            max_polling_interval: Intervalo máximo entre verificações do status do lote em segundos
+            timeout: Tempo máximo de espera pelo lote em segundos; ao estourar, o lote é
+                cancelado e os documentos enviados recebem resultado de erro
+            
+        Returns:
+            Resultados de validação na mesma ordem de documents
+        """
+        # Monta o arquivo JSONL com uma requisição por documento
+        lines = []
+        specific_results = {}
+        rejections = {}
+        now = datetime.now()
+        for index, (document_data, document_type) in enumerate(documents):
+            prepared = self._prepare_validation(document_data.get("extracted_fields", {}), document_type, now)
+            if prepared is None:
+                continue
+            
+            prompt, model, specific_results[index], rejection = prepared
+            if rejection is not None:
+                # Documento já reprovado pelas validações determinísticas: fica fora do lote
+                rejections[index] = rejection
+                continue
+            
+            lines.append(orjson.dumps({
+                "custom_id": str(index),
+                "method": "POST",
+                "url": "/v1/chat/completions",
+                "body": {
+                    "model": model,
+                    "messages": self._build_messages(prompt, document_type),
+                    "temperature": self.temperature,
+                    "max_tokens": 2000,
+                    "response_format": {"type": "json_object"}
+                }
+            }))
+        
+        batch_error = None
+        try:
+            responses = self._run_batch(b"\n".join(lines), max_polling_interval, timeout) if lines else {}
+        except Exception as e:
+            st.error(f"Erro na validação em lote: {str(e)}")
+            responses = {}
+            batch_error = f"Erro na validação em lote: {str(e)}"
+        
+        # Associa as respostas aos documentos pelo custom_id
+        results = []
+        for index, (document_data, document_type) in enumerate(documents):
+            if index in rejections:
+                results.append(rejections[index])
+                continue
+            
+            response = responses.get(str(index))
+            if response is None:
+                results.append({
+                    "is_valid": False,
+                    "errors": [batch_error or "Validação em lote não retornou resultado para o documento"],
+                    "warnings": [],
+                    "confidence": 0.0,
+                    "completed": False
+                })
+                continue
+            
+            validation_result = self._parse_validation_response(response)
+            validation_result.update(specific_results[index])
+            results.append(validation_result)
+        
+        return results
+    
+    def _run_batch(self, jsonl: bytes, max_polling_interval: float, timeout: float) -> Dict[str, str]:
+        """Envia o lote, aguarda a conclusão e retorna as respostas por custom_id."""
+        input_file = self.client.files.create(
+            file=("validations.jsonl", jsonl),
+            purpose="batch"
+        )
+        batch = self.client.batches.create(
+            completion_window="24h",
+            endpoint="/v1/chat/completions",
+            input_file_id=input_file.id
+        )
+        
+        # Lotes pequenos costumam terminar rápido; os maiores são verificados cada vez menos
+        deadline = time.monotonic() + timeout
+        delay = BATCH_POLLING_BASE_DELAY
+        while batch.status not in ("completed", "failed", "expired", "cancelled"):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                # Libera o lote no Groq antes de desistir dele
+                self.client.batches.cancel(batch.id)
+                raise TimeoutError(f"Timeout após {timeout:.0f}s aguardando o lote {batch.id}")
+            time.sleep(min(delay, remaining))
+            delay = min(delay * 2, max_polling_interval)
+            batch = self.client.batches.retrieve(batch.id)
+        
+        if batch.status != "completed" or not batch.output_file_id:
+            raise RuntimeError(f"Lote {batch.id} finalizado com status {batch.status}")
+        
+        output = self.client.files.content(batch.output_file_id).read()
+        
+        responses = {}
+        for line in output.splitlines():
+            if not line.strip():
+                continue
+            item = orjson.loads(line)
+            body = (item.get("response") or {}).get("body") or {}
+            choices = body.get("choices") or []
+            if choices:
+                responses[item["custom_id"]] = choices[0]["message"]["content"]
+        
+        return responses
+    
+    def _prepare_validation(
+        self,
+        extracted_fields: Dict[str, Any],
+        document_type: str,
+        now: Optional[datetime] = None
+    ) -> Optional[Tuple[Optional[str], Optional[str], Dict[str, Any], Optional[Dict[str, Any]]]]:
+        """
+        Executa as etapas locais da validação antes da chamada ao Groq.
+        
+        Returns:
+            Tupla (prompt, modelo, validações determinísticas, rejeição) ou None se o tipo
+            não for suportado. Quando as validações determinísticas já reprovam o documento,
+            rejeição traz o resultado final e prompt e modelo são None.
+        """
+        if document_type not in DATE_FIELDS:
+            return None
+        
+        # As datas são convertidas uma vez e compartilhadas entre as duas etapas
+        dates = _parse_dates(extracted_fields, DATE_FIELDS[document_type])
+        if document_type == "cnh":
+            processed_data = self.preprocess_cnh_data(extracted_fields, now, dates)
+        else:
+            processed_data = self.preprocess_rg_data(extracted_fields, now, dates)
+        
+        specific_result = self._validate_specific_fields(extracted_fields, document_type, dates)
+        
+        rejection = self._deterministic_rejection(processed_data, specific_result)
+        if rejection is not None:
+            return None, None, specific_result, rejection
+        
+        if document_type == "cnh":
+            prompt = self._create_enhanced_cnh_prompt(processed_data)
+        else:
+            prompt = self._create_enhanced_rg_prompt(processed_data)
+        
+        model = self._select_model(document_type, extracted_fields, processed_data, specific_result)
+        return prompt, model, specific_result, None
+    
+    def _deterministic_rejection(
+        self,
+        processed_data: Dict[str, Any],
+        specific_result: Dict[str, Any]
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Monta o resultado de documentos que as regras determinísticas já reprovam.
+        
+        Erros específicos (CPF, datas malformadas) ou datas fora de ordem tornam o
+        documento inválido independentemente da análise do modelo, então a chamada
+        ao Groq é dispensada.
+        """
+        date_errors = [
+            DATE_COMPARISON_ERRORS[name]
+            for name, ok in processed_data.get("comparacoes_datas", {}).items()
+            if not ok and name in DATE_COMPARISON_ERRORS
+        ]
+        has_specific_errors = any(
+            errors for key, errors in specific_result.items() if key.endswith("_errors")
+        )
+        
+        if not date_errors and not has_specific_errors:
+            return None
+        
+        return {
+            "is_valid": False,
+            "confidence": 1.0,
+            "errors": date_errors,
+            "warnings": [],
+            "analysis": "Documento reprovado pelas validações determinísticas; análise pelo modelo dispensada.",
+            "recommendations": ["Verificar manualmente os dados extraídos"],
+            **specific_result
+        }
+    
+    def _select_model(
+        self,
+        document_type: str,
+        extracted_fields: Dict[str, Any],
+        processed_data: Dict[str, Any],
+        specific_result: Dict[str, Any]
+    ) -> str:
+        """
+        Escolhe o modelo do Groq pela complexidade do documento.
+        
+        Documentos completos que passam em todas as verificações determinísticas
+        usam o modelo instantâneo; os demais usam o modelo padrão.
+        """
+        has_required = all(extracted_fields.get(field) for field in REQUIRED_FIELDS.get(document_type, ()))
+        has_issues = any(specific_result.values())
+        dates_consistent = all(processed_data.get("comparacoes_datas", {}).values())
+        
+        if has_required and not has_issues and dates_consistent:
+            return MODEL_TIERS["instant"]
+        return self.model
+    
+    def _validate_specific_fields(
+        self,
+        extracted_fields: Dict[str, Any],
+        document_type: str,
+        dates: Optional[Dict[str, Optional[datetime]]] = None
+    ) -> Dict[str, Any]:
+        """Executa as validações determinísticas do tipo de documento."""
+        if document_type == "cnh":
+            return self._validate_cnh_specific_fields(extracted_fields, dates)
+        elif document_type == "rg":
+            return self._validate_rg_specific_fields(extracted_fields, dates)
+        return {}
+    
     def _validate_cnh(self, document_data: Dict[str, Any]) -> Dict[str, Any]:
         """Valida CNH usando Groq com pré-processamento."""
         
-        # Prepara os dados para o prompt
-        extracted_fields = document_data.get("extracted_fields", {})
-        processed_data = self.preprocess_cnh_data(extracted_fields)
-        # Cria o prompt específico para CNH com pré-processamento
-        prompt = self._create_enhanced_cnh_prompt(processed_data)
+        # Pré-processa os dados, executa as validações específicas de CNH e cria o prompt
+        prompt, model, specific_result, rejection = self._prepare_validation(
+            document_data.get("extracted_fields", {}), "cnh"
+        )
+        
+        # Documentos já reprovados não precisam da análise do modelo
+        if rejection is not None:
+            return rejection
         
-        # Chama o Groq
-        response = self._call_groq(prompt)
+        # Chama o Groq com o modelo adequado à complexidade do documento
+        response = self._call_groq(prompt, model=model, document_type="cnh")
         
         # Processa a resposta
         validation_result = self._parse_validation_response(response)
-        
-        # Adiciona validações específicas de CNH
-        validation_result.update(self._validate_cnh_specific_fields(extracted_fields))
+        validation_result.update(specific_result)
         
         return validation_result
     
     def _validate_rg(self, document_data: Dict[str, Any]) -> Dict[str, Any]:
         """Valida RG usando Groq com pré-processamento."""
         
-        # Prepara os dados para o prompt
-        extracted_fields = document_data.get("extracted_fields", {})
-        processed_data = self.preprocess_rg_data(extracted_fields)
-        # Cria o prompt específico para RG com pré-processamento
-        prompt = self._create_enhanced_rg_prompt(processed_data)
+        # Pré-processa os dados, executa as validações específicas de RG e cria o prompt
+        prompt, model, specific_result, rejection = self._prepare_validation(
+            document_data.get("extracted_fields", {}), "rg"
+        )
+        
+        # Documentos já reprovados não precisam da análise do modelo
+        if rejection is not None:
+            return rejection
         
-        # Chama o Groq
-        response = self._call_groq(prompt)
+        # Chama o Groq com o modelo adequado à complexidade do documento
+        response = self._call_groq(prompt, model=model, document_type="rg")
         
         # Processa a resposta
         validation_result = self._parse_validation_response(response)
-        
-        # Adiciona validações específicas de RG
-        validation_result.update(self._validate_rg_specific_fields(extracted_fields))
+        validation_result.update(specific_result)
         
         return validation_result
 
     def _create_enhanced_cnh_prompt(self, fields: Dict[str, Any]) -> str:
         """
-        Cria prompt melhorado com dados pré-processados para CNH
+        Cria prompt compacto com dados pré-processados para CNH
         """
-        
-        return f"""
-Você é um especialista em validação de documentos brasileiros. Analise os dados PRÉ-PROCESSADOS de uma CNH.
-
-DADOS PRÉ-PROCESSADOS:
-{json.dumps(fields, indent=2, ensure_ascii=False)}
-
-INSTRUÇÕES DE VALIDAÇÃO:
-
-1. **Use os dados pré-processados** - As comparações de datas já foram calculadas
-2. **Campos obrigatórios**: nome, cpf, numero_registro, todas as datas
-3. **Validações automáticas já calculadas**:
-   - idade_atual: idade da pessoa hoje
-   - idade_na_emissao: idade quando a CNH foi emitida (deve ser ≥ 18)
-   - dias_para_vencimento: negativo se vencida
-   - periodo_validade_anos: deve ser 3-5 anos
-   - comparacoes_datas: validações lógicas já calculadas
-
-4. **Regras de validação**:
-   - comparacoes_datas.nascimento_anterior_emissao deve ser true
-   - comparacoes_datas.emissao_anterior_validade deve ser true  
-   - comparacoes_datas.primeira_hab_anterior_emissao deve ser true
-   - idade_na_emissao deve ser ≥ 18
-   - periodo_validade_anos deve ser 3, 4 ou 5
-   - CPF deve ter formato XXX.XXX.XXX-XX (11 dígitos)
-   - numero_registro deve ter 11 dígitos
-   - categoria pode estar vazia (erro de extração)
-
-5. **NÃO faça comparações manuais de datas** - use os campos pré-processados
-
-Responda em JSON:
-{{
-    "is_valid": true/false,
-    "confidence": 0.0-1.0,
-    "errors": ["erros críticos"],
-    "warnings": ["avisos"],
-    "analysis": "análise detalhada",
-    "recommendations": ["recomendações"]
-}}
-
-Seja preciso e use APENAS os dados pré-processados para validação.
-"""
+        return f"Dados pré-processados da CNH: {orjson.dumps(fields).decode()}"
 
     def _create_enhanced_rg_prompt(self, fields: Dict[str, Any]) -> str:
         """
-        Cria prompt melhorado com dados pré-processados para RG
+        Cria prompt compacto com dados pré-processados para RG
         """
-        processed_data = self.preprocess_rg_data(fields)
-        
-        return f"""
-Você é um especialista em validação de documentos brasileiros. Analise os dados PRÉ-PROCESSADOS de um RG.
-
-DADOS PRÉ-PROCESSADOS:
-{json.dumps(processed_data, indent=2, ensure_ascii=False)}
-
-INSTRUÇÕES DE VALIDAÇÃO:
-
-1. **Use os dados pré-processados** - As comparações de datas já foram calculadas
-2. **Campos obrigatórios**: nome, numero_rg, data_nascimento, data_emissao
-3. **Validações automáticas já calculadas**:
-   - idade_atual: idade da pessoa hoje
-   - idade_na_emissao: idade quando o RG foi emitido
-   - comparacoes_datas: validações lógicas já calculadas
-
-4. **Regras de validação**:
-   - comparacoes_datas.nascimento_anterior_emissao deve ser true
-   - idade_na_emissao deve ser ≥ 0 (pode ser emitido para recém-nascidos)
-   - CPF deve ter formato XXX.XXX.XXX-XX (se presente)
-   - numero_rg deve ter formato válido para o estado
-   - Órgão emissor deve ser válido (SSP, DETRAN, etc.)
-
-5. **Coerência geográfica**:
-   - Local de nascimento deve corresponder ao órgão emissor
-   - Estado emissor deve ser UF válida
-
-6. **NÃO faça comparações manuais de datas** - use os campos pré-processados
-
-Responda em JSON:
-{{
-    "is_valid": true/false,
-    "confidence": 0.0-1.0,
-    "errors": ["erros críticos"],
-    "warnings": ["avisos"],
-    "analysis": "análise detalhada",
-    "recommendations": ["recomendações"]
-}}
-
-Seja preciso e use APENAS os dados pré-processados para validação.
-"""
+        return f"Dados pré-processados do RG: {orjson.dumps(fields).decode()}"
 
-    def _call_groq(self, prompt: str) -> str:
-        """Chama a API do Groq."""
+    def _call_groq(
+        self,
+        prompt: str,
+        model: Optional[str] = None,
+        document_type: Optional[str] = None
+    ) -> str:
+        """Chama a API do Groq, reaproveitando respostas de prompts idênticos."""
+        
+        model = model or self.model
+        messages = self._build_messages(prompt, document_type)
+        cache_key = self._response_cache_key(messages, model)
+        if cache_key is not None:
+            cached = self.response_cache.get(cache_key)
+            if cached is not None:
+                return cached["content"]
         
         try:
-            completion = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "Você é um especialista em validação de documentos brasileiros. Sempre responda em JSON válido."
-                    },
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ],
-                temperature=0.1,  # Temperatura baixa para mais consistência
-                max_tokens=2000
+            stream = self.client.chat.completions.create(
+                model=model,
+                messages=messages,
+                temperature=self.temperature,
+                max_tokens=2000,
+                stream=True
             )
             
-            return completion.choices[0].message.content
+            # Encerra o stream assim que o objeto JSON da resposta se fecha
+            collector = _JsonObjectCollector()
+            try:
+                for chunk in stream:
+                    if chunk.choices and chunk.choices[0].delta.content and collector.feed(chunk.choices[0].delta.content):
+                        break
+            finally:
+                stream.close()
+            
+            # Respostas truncadas ou sem JSON não são reaproveitadas nas próximas tentativas
+            content = collector.content
+            if cache_key is not None and collector.is_json_object():
+                self.response_cache.put(cache_key, {"content": content})
+            
+            return content
+            
+        except Exception as e:
+            st.error(f"Erro na chamada do Groq: {str(e)}")
+            raise
+    
+    async def _acall_groq(
+        self,
+        prompt: str,
+        aclient: AsyncGroq,
+        model: Optional[str] = None,
+        document_type: Optional[str] = None
+    ) -> str:
+        """Versão assíncrona de _call_groq, usando o cliente compartilhado aclient."""
+        
+        model = model or self.model
+        messages = self._build_messages(prompt, document_type)
+        cache_key = self._response_cache_key(messages, model)
+        if cache_key is not None:
+            cached = self.response_cache.get(cache_key)
+            if cached is not None:
+                return cached["content"]
+        
+        try:
+            stream = await aclient.chat.completions.create(
+                model=model,
+                messages=messages,
+                temperature=self.temperature,
+                max_tokens=2000,
+                stream=True
+            )
+            
+            collector = _JsonObjectCollector()
+            try:
+                async for chunk in stream:
+                    if chunk.choices and chunk.choices[0].delta.content and collector.feed(chunk.choices[0].delta.content):
+                        break
+            finally:
+                await stream.close()
+            
+            # Respostas truncadas ou sem JSON não são reaproveitadas nas próximas tentativas
+            content = collector.content
+            if cache_key is not None and collector.is_json_object():
+                self.response_cache.put(cache_key, {"content": content})
+            
+            return content
             
         except Exception as e:
             st.error(f"Erro na chamada do Groq: {str(e)}")
             raise
     
+    def _response_cache_key(self, messages: List[Dict[str, str]], model: str) -> Optional[str]:
+        """Chave do cache de respostas, ou None se a temperatura não permitir reaproveitamento."""
+        if self.temperature > MAX_CACHEABLE_TEMPERATURE:
+            return None
+        prompt_hash = hashlib.sha256(orjson.dumps(messages)).hexdigest()
+        return f"{model}:{PROMPT_VERSION}:{prompt_hash}"
+    
+    def _build_messages(self, prompt: str, document_type: Optional[str] = None) -> List[Dict[str, str]]:
+        """Monta as mensagens enviadas ao Groq, com as regras do tipo de documento no sistema."""
+        return [
+            {
+                "role": "system",
+                "content": SYSTEM_PROMPTS.get(document_type, DEFAULT_SYSTEM_PROMPT)
+            },
+            {
+                "role": "user",
+                "content": prompt
+            }
+        ]
+    
     def _parse_validation_response(self, response: str) -> Dict[str, Any]:
-        """Processa a resposta do Groq."""
+        """Processa a resposta do Groq; respostas que não puderam ser interpretadas vêm com completed=False."""
         
         try:
-            # Tenta extrair JSON da resposta
-            json_match = re.search(r'\{.*\}', response, re.DOTALL)
-            if json_match:
-                json_str = json_match.group()
-                result = json.loads(json_str)
-                
+            # O stream é recortado no objeto JSON e o lote usa o modo JSON do Groq,
+            # então a resposta inteira já é o documento JSON
+            result = orjson.loads(response)
+            
+            if isinstance(result, dict):
                 # Garante que todos os campos necessários estão presentes
                 return {
                     "is_valid": result.get("is_valid", False),
@@ -321,17 +930,18 @@ Seja preciso e use APENAS os dados pré-processados para validação.
                     "recommendations": result.get("recommendations", [])
                 }
             else:
-                # Se não conseguir extrair JSON, cria resposta padrão
+                # Se a resposta não for um objeto JSON, cria resposta padrão
                 return {
                     "is_valid": False,
                     "confidence": 0.0,
                     "errors": ["Não foi possível processar a resposta do validador"],
                     "warnings": [],
                     "analysis": response,
-                    "recommendations": ["Verificar manualmente os dados extraídos"]
+                    "recommendations": ["Verificar manualmente os dados extraídos"],
+                    "completed": False
                 }
                 
-        except json.JSONDecodeError as e:
+        except orjson.JSONDecodeError as e:
             st.warning(f"Erro ao processar resposta JSON: {str(e)}")
             return {
                 "is_valid": False,
@@ -339,10 +949,15 @@ Seja preciso e use APENAS os dados pré-processados para validação.
                 "errors": [f"Erro no formato da resposta: {str(e)}"],
                 "warnings": [],
                 "analysis": response,
-                "recommendations": ["Verificar manualmente os dados extraídos"]
+                "recommendations": ["Verificar manualmente os dados extraídos"],
+                "completed": False
             }
     
-    def _validate_cnh_specific_fields(self, fields: Dict[str, Any]) -> Dict[str, Any]:
+    def _validate_cnh_specific_fields(
+        self,
+        fields: Dict[str, Any],
+        dates: Optional[Dict[str, Optional[datetime]]] = None
+    ) -> Dict[str, Any]:
         """Validações específicas para CNH."""
         errors = []
         warnings = []
@@ -356,8 +971,8 @@ Seja preciso e use APENAS os dados pré-processados para validação.
         numero_registro = fields.get("numero_registro")
         if numero_registro:
             # Remove caracteres não numéricos para validação
-            numero_clean = re.sub(r'[^0-9]', '', str(numero_registro))
-            if not re.fullmatch(r"\d{11}", numero_clean):
+            numero_clean = _only_digits(str(numero_registro))
+            if len(numero_clean) != 11:
                 warnings.append("Número de registro não segue o padrão de CNH (11 dígitos)")
         
         # Validação de categoria
@@ -366,11 +981,13 @@ Seja preciso e use APENAS os dados pré-processados para validação.
             warnings.append("Categoria de CNH pode estar incorreta")
         
         # Validação de data de validade
+        today = date.today()
         data_validade = fields.get("data_validade")
         if data_validade:
-            if not self._is_valid_date(data_validade):
+            validade = self._field_iso_date(fields, "data_validade", dates)
+            if not self._is_plausible_date(validade, today):
                 errors.append("Data de validade inválida")
-            elif self._is_expired(data_validade):
+            elif validade < today:
                 warnings.append("CNH está vencida")
         
         return {
@@ -378,7 +995,11 @@ Seja preciso e use APENAS os dados pré-processados para validação.
             "cnh_specific_warnings": warnings
         }
 
-    def _validate_rg_specific_fields(self, fields: Dict[str, Any]) -> Dict[str, Any]:
+    def _validate_rg_specific_fields(
+        self,
+        fields: Dict[str, Any],
+        dates: Optional[Dict[str, Optional[datetime]]] = None
+    ) -> Dict[str, Any]:
         """Validações específicas para RG."""
         errors = []
         warnings = []
@@ -407,7 +1028,9 @@ Seja preciso e use APENAS os dados pré-processados para validação.
         
         # Validação de data de nascimento
         data_nascimento = fields.get("data_nascimento")
-        if data_nascimento and not self._is_valid_date(data_nascimento):
+        if data_nascimento and not self._is_plausible_date(
+            self._field_iso_date(fields, "data_nascimento", dates), date.today()
+        ):
             errors.append("Data de nascimento inválida")
         
         return {
@@ -416,13 +1039,13 @@ Seja preciso e use APENAS os dados pré-processados para validação.
         }
 
     def _is_valid_cpf(self, cpf: str) -> bool:
-        """Valida CPF usando validate_docbr."""
+        """Valida formato e dígitos verificadores do CPF."""
         if not cpf:
             return False
         
         try:
             # Remove caracteres não numéricos
-            cpf_clean = re.sub(r'[^0-9]', '', str(cpf))
+            cpf_clean = _cpf_digits(str(cpf))
             
             # Verifica se tem 11 dígitos
             if len(cpf_clean) != 11:
@@ -432,54 +1055,39 @@ Seja preciso e use APENAS os dados pré-processados para validação.
             if cpf_clean == cpf_clean[0] * 11:
                 return False
                 
-            return validate_docbr.CPF().validate(cpf_clean)
-        except:
-            return False
-
-    def _is_valid_date(self, date_str: str) -> bool:
-        """Valida formato de data (formato yyyy-mm-dd)."""
-        if not date_str:
-            return False
-            
-        try:
-            date_str = date_str.strip()
-            parsed_date = datetime.strptime(date_str, "%Y-%m-%d")
-            
-            # Verifica se a data é razoável (não muito no futuro ou passado)
-            current_year = datetime.now().year
-            if 1900 <= parsed_date.year <= current_year + 50:
-                return True
-            return False
-        except:
-            return False
-
-    def _is_expired(self, date_str: str) -> bool:
-        """Verifica se a data está vencida (formato yyyy-mm-dd)."""
-        if not date_str:
-            return False
-            
-        try:
-            date_str = date_str.strip()
-            doc_date = datetime.strptime(date_str, "%Y-%m-%d").date()
-            return doc_date < date.today()
+            return _cpf_check_digits_ok(cpf_clean)
         except:
             return False
 
+    def _field_iso_date(
+        self,
+        fields: Dict[str, Any],
+        field: str,
+        dates: Optional[Dict[str, Optional[datetime]]]
+    ) -> Optional[date]:
+        """Data yyyy-mm-dd do campo, reaproveitando a conversão do pré-processamento quando houver."""
+        value = str(fields[field]).strip()
+        if dates is None or field not in dates:
+            return _parse_iso_date(value)
+        
+        # O pré-processamento também aceita dd/mm/yyyy, formato inválido nas validações específicas
+        parsed = dates[field]
+        if parsed is None or '/' in value:
+            return None
+        return parsed.date()
+    
+    @staticmethod
+    def _is_plausible_date(parsed_date: Optional[date], today: date) -> bool:
+        """Verifica se a data é razoável (não muito no futuro ou passado)."""
+        return parsed_date is not None and 1900 <= parsed_date.year <= today.year + 50
+    
     def _is_valid_cnh_category(self, category: str) -> bool:
         """Valida categoria de CNH."""
         if not category:
             return False
-            
-        # Categorias válidas de CNH no Brasil
-        valid_categories = [
-            "A", "B", "C", "D", "E", 
-            "AB", "AC", "AD", "AE", 
-            "ACC"
-        ]
         
         # Limpa e converte para maiúscula
-        category_clean = category.strip().upper()
-        return category_clean in valid_categories
+        return category.strip().upper() in _CNH_CATEGORIES
 
     def _is_valid_rg_format(self, rg: str) -> bool:
         """Valida formato básico de RG."""
@@ -488,7 +1096,7 @@ Seja preciso e use APENAS os dados pré-processados para validação.
             
         try:
             # Remove caracteres não alfanuméricos
-            rg_clean = re.sub(r'[^a-zA-Z0-9]', '', str(rg))
+            rg_clean = _only_alnum(str(rg))
             
             # RG deve ter pelo menos 7 caracteres e no máximo 10
             if len(rg_clean) < 7 or len(rg_clean) > 10:
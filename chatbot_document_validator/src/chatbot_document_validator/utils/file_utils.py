@@ -1,45 +1,89 @@
 """
 Utilitários para processamento de arquivos.
 """
+import atexit
 import os
+import re
+import shutil
 import tempfile
+import uuid
+from functools import lru_cache
 from pathlib import Path
 from typing import Optional, Tuple, List
 import streamlit as st
 from PIL import Image
 import io
 
+try:
+    import pyvips
+except ImportError:  # Dependência opcional (extra "vips")
+    pyvips = None
+
+
+# Tamanho dos blocos usados ao copiar arquivos enviados
+COPY_CHUNK_SIZE = 64 * 1024
+
+# Palavras-chave do nome do arquivo por tipo de documento; CNH tem prioridade sobre RG
+_CNH_FILENAME_RE = re.compile(r'cnh|habilitacao|carteira')
+_RG_FILENAME_RE = re.compile(r'rg|registro|identidade')
+
+
+@lru_cache(maxsize=1)
+def _session_temp_dir() -> str:
+    """Diretório temporário único do processo, removido ao encerrar."""
+    temp_dir = tempfile.mkdtemp(prefix="docvalidator_")
+    atexit.register(shutil.rmtree, temp_dir, ignore_errors=True)
+    return temp_dir
+
+
+@lru_cache(maxsize=128)
+def _document_type_from_filename(filename: str) -> str:
+    """Inferência do tipo pelo nome, memorizada entre os reruns do Streamlit."""
+    filename_lower = filename.lower()
+    
+    if _CNH_FILENAME_RE.search(filename_lower):
+        return 'cnh'
+    elif _RG_FILENAME_RE.search(filename_lower):
+        return 'rg'
+    else:
+        return 'Não reconhecido tipo de documento, exemplo: cnh.pdf, rg.png, etc...'
+
 
 class FileProcessor:
     """Utilitário para processamento de arquivos."""
     
     # Tipos de arquivo suportados
     SUPPORTED_EXTENSIONS = {
-        'image': ['.jpg', '.jpeg', '.png', '.bmp', '.tiff', '.tif'],
-        'pdf': ['.pdf'],
-        'document': ['.pdf', '.jpg', '.jpeg', '.png', '.bmp', '.tiff', '.tif']
+        'image': frozenset({'.jpg', '.jpeg', '.png', '.bmp', '.tiff', '.tif'}),
+        'pdf': frozenset({'.pdf'}),
+        'document': frozenset({'.pdf', '.jpg', '.jpeg', '.png', '.bmp', '.tiff', '.tif'})
     }
     
     # Tamanho máximo de arquivo (10MB)
     MAX_FILE_SIZE = 10 * 1024 * 1024
     
+    # Redimensiona imagens com libvips (SIMD e multithread) quando o pyvips estiver instalado
+    USE_PYVIPS = False
+    
+    @staticmethod
+    def get_extension(file_path: str) -> str:
+        """Retorna a extensão do arquivo em minúsculas, sem acessar o disco."""
+        return os.path.splitext(file_path)[1].lower()
+    
     @classmethod
     def is_supported_file(cls, file_path: str) -> bool:
         """Verifica se o arquivo é suportado."""
-        extension = Path(file_path).suffix.lower()
-        return extension in cls.SUPPORTED_EXTENSIONS['document']
+        return cls.get_extension(file_path) in cls.SUPPORTED_EXTENSIONS['document']
     
     @classmethod
     def is_image_file(cls, file_path: str) -> bool:
         """Verifica se o arquivo é uma imagem."""
-        extension = Path(file_path).suffix.lower()
-        return extension in cls.SUPPORTED_EXTENSIONS['image']
+        return cls.get_extension(file_path) in cls.SUPPORTED_EXTENSIONS['image']
     
     @classmethod
     def is_pdf_file(cls, file_path: str) -> bool:
         """Verifica se o arquivo é um PDF."""
-        extension = Path(file_path).suffix.lower()
-        return extension in cls.SUPPORTED_EXTENSIONS['pdf']
+        return cls.get_extension(file_path) in cls.SUPPORTED_EXTENSIONS['pdf']
     
     @classmethod
     def validate_file_size(cls, file_path: str) -> bool:
@@ -54,10 +98,9 @@ class FileProcessor:
     def get_file_info(cls, file_path: str) -> Tuple[str, int, str]:
         """Retorna informações do arquivo."""
         path = Path(file_path)
-        file_size = os.path.getsize(file_path)
-        file_type = path.suffix.lower()
         
-        return str(path.name), file_size, file_type
+        # Um único stat; nome e extensão vêm do caminho
+        return path.name, path.stat().st_size, cls.get_extension(file_path)
     
     @classmethod
     def save_uploaded_file(cls, uploaded_file) -> Optional[str]:
@@ -66,13 +109,13 @@ class FileProcessor:
             if uploaded_file is None:
                 return None
             
-            # Cria diretório temporário
-            temp_dir = tempfile.mkdtemp()
-            temp_path = os.path.join(temp_dir, uploaded_file.name)
+            temp_path = cls.create_temp_file_path(uploaded_file.name)
             
-            # Salva o arquivo
+            # Salva o arquivo em blocos, sem materializar uma cópia do conteúdo
+            uploaded_file.seek(0)
             with open(temp_path, "wb") as f:
-                f.write(uploaded_file.getbuffer())
+                shutil.copyfileobj(uploaded_file, f, COPY_CHUNK_SIZE)
+            uploaded_file.seek(0)
             
             return temp_path
             
@@ -84,12 +127,10 @@ class FileProcessor:
     def cleanup_temp_file(cls, file_path: str) -> None:
         """Remove arquivo temporário."""
         try:
-            if file_path and os.path.exists(file_path):
+            if file_path:
                 os.remove(file_path)
-                # Remove diretório pai se estiver vazio
-                parent_dir = os.path.dirname(file_path)
-                if os.path.exists(parent_dir) and not os.listdir(parent_dir):
-                    os.rmdir(parent_dir)
+        except FileNotFoundError:
+            pass
         except Exception as e:
             st.warning(f"Erro ao limpar arquivo temporário: {str(e)}")
     
@@ -106,19 +147,56 @@ class FileProcessor:
     @classmethod
     def resize_image_if_needed(cls, image_path: str, max_size: Tuple[int, int] = (1920, 1080)) -> str:
         """Redimensiona imagem se necessário."""
+        if cls.USE_PYVIPS and pyvips is not None:
+            return cls._resize_image_with_vips(image_path, max_size)
+        
         try:
             with Image.open(image_path) as img:
-                # Verifica se precisa redimensionar
-                if img.size[0] > max_size[0] or img.size[1] > max_size[1]:
-                    img.thumbnail(max_size, Image.Resampling.LANCZOS)
-                    
-                    # Salva imagem redimensionada
-                    temp_path = tempfile.mktemp(suffix=Path(image_path).suffix)
-                    img.save(temp_path, quality=85, optimize=True)
-                    return temp_path
+                # Imagens dentro do limite são usadas sem recodificação
+                if img.size[0] <= max_size[0] and img.size[1] <= max_size[1]:
+                    return image_path
                 
-                return image_path
+                image_format = img.format
+                img.thumbnail(max_size, Image.Resampling.LANCZOS)
                 
+                # Salva imagem redimensionada
+                suffix = cls.get_extension(image_path)
+                with tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as temp_file:
+                    img.save(temp_file, format=image_format, **cls._image_save_options(image_format))
+                return temp_file.name
+                
+        except Exception as e:
+            st.warning(f"Erro ao redimensionar imagem: {str(e)}")
+            return image_path
+    
+    @staticmethod
+    def _image_save_options(image_format: Optional[str]) -> dict:
+        """Opções de gravação por formato; PNG usa compressão moderada para não gastar CPU à toa."""
+        if image_format == 'JPEG':
+            return {"quality": 85, "optimize": True, "progressive": True}
+        if image_format == 'PNG':
+            return {"compress_level": 6}
+        return {}
+    
+    @classmethod
+    def _resize_image_with_vips(cls, image_path: str, max_size: Tuple[int, int]) -> str:
+        """Versão de resize_image_if_needed com libvips."""
+        try:
+            img = pyvips.Image.new_from_file(image_path, access="sequential")
+            scale = min(max_size[0] / img.width, max_size[1] / img.height)
+            if scale >= 1:
+                return image_path
+            
+            suffix = cls.get_extension(image_path)
+            with tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as temp_file:
+                temp_path = temp_file.name
+            resized = img.resize(scale, kernel="lanczos3")
+            if suffix in ('.jpg', '.jpeg'):
+                resized.jpegsave(temp_path, Q=85, optimize_coding=True)
+            else:
+                resized.write_to_file(temp_path)
+            return temp_path
+            
         except Exception as e:
             st.warning(f"Erro ao redimensionar imagem: {str(e)}")
             return image_path
@@ -132,11 +210,11 @@ class FileProcessor:
         # Verifica extensão
         file_name = uploaded_file.name
         if not cls.is_supported_file(file_name):
-            supported_extensions = ", ".join(cls.SUPPORTED_EXTENSIONS['document'])
+            supported_extensions = ", ".join(sorted(cls.SUPPORTED_EXTENSIONS['document']))
             return False, f"Tipo de arquivo não suportado. Suportados: {supported_extensions}"
         
         # Verifica tamanho
-        file_size = len(uploaded_file.getbuffer())
+        file_size = uploaded_file.size
         if file_size > cls.MAX_FILE_SIZE:
             max_size_mb = cls.MAX_FILE_SIZE / (1024 * 1024)
             return False, f"Arquivo muito grande. Tamanho máximo: {max_size_mb}MB"
@@ -146,47 +224,54 @@ class FileProcessor:
     @classmethod
     def get_document_type_from_filename(cls, filename: str) -> str:
         """Tenta inferir o tipo de documento pelo nome do arquivo."""
-        filename_lower = filename.lower()
-        
-        if any(keyword in filename_lower for keyword in ['cnh', 'habilitacao', 'carteira']):
-            return 'cnh'
-        elif any(keyword in filename_lower for keyword in ['rg', 'registro', 'identidade']):
-            return 'rg'
-        else:
-            return 'Não reconhecido tipo de documento, exemplo: cnh.pdf, rg.png, etc...'
+        return _document_type_from_filename(filename)
     
     @classmethod
     def create_temp_file_path(cls, original_filename: str) -> str:
-        """Cria caminho para arquivo temporário."""
-        temp_dir = tempfile.mkdtemp()
-        return os.path.join(temp_dir, original_filename)
+        """
+        Cria caminho único para arquivo temporário no diretório da sessão.
+        
+        O nome gravado leva um prefixo uuid; quem processa o arquivo deve informar
+        o nome original (ver DocumentProcessor.process_document).
+        """
+        filename = os.path.basename(original_filename)
+        return os.path.join(_session_temp_dir(), f"{uuid.uuid4().hex}_{filename}")
 
 
 class DocumentAnalyzer:
     """Analisador de documentos."""
     
     @staticmethod
-    def analyze_document_content(file_path: str) -> dict:
-        """Analisa o conteúdo do documento para inferir tipo."""
+    def analyze_document_content(file_path: str, filename: Optional[str] = None) -> dict:
+        """Analisa o conteúdo do documento para inferir tipo; filename substitui o nome do arquivo em disco."""
         try:
-            file_info = FileProcessor.get_file_info(file_path)
-            filename, file_size, file_type = file_info
-            
-            analysis = {
-                "filename": filename,
-                "file_size": file_size,
-                "file_type": file_type,
-                "inferred_document_type": FileProcessor.get_document_type_from_filename(filename),
-                "is_image": FileProcessor.is_image_file(file_path),
-                "is_pdf": FileProcessor.is_pdf_file(file_path)
-            }
-            
-            return analysis
+            # Um único stat fornece o tamanho; o restante vem do nome do arquivo
+            file_size = os.stat(file_path).st_size
+            return DocumentAnalyzer._build_analysis(filename or Path(file_path).name, file_size)
             
         except Exception as e:
             st.error(f"Erro ao analisar documento: {str(e)}")
             return {}
     
+    @staticmethod
+    def analyze_document_bytes(data: bytes, filename: str) -> dict:
+        """Analisa um documento em memória para inferir tipo."""
+        return DocumentAnalyzer._build_analysis(filename, len(data))
+    
+    @staticmethod
+    def _build_analysis(filename: str, file_size: int) -> dict:
+        """Monta a análise a partir do nome e do tamanho do arquivo."""
+        file_type = FileProcessor.get_extension(filename)
+        
+        return {
+            "filename": filename,
+            "file_size": file_size,
+            "file_type": file_type,
+            "inferred_document_type": FileProcessor.get_document_type_from_filename(filename),
+            "is_image": file_type in FileProcessor.SUPPORTED_EXTENSIONS['image'],
+            "is_pdf": file_type in FileProcessor.SUPPORTED_EXTENSIONS['pdf']
+        }
+    
     @staticmethod
     def extract_text_from_image(image_path: str) -> Optional[str]:
         """Extrai texto de imagem usando OCR básico."""
@@ -1,10 +1,17 @@
 """
 Testes básicos para o Chatbot Validador de Documentos.
 """
+import asyncio
+import io
 import pytest
 import tempfile
 import os
-from unittest.mock import Mock, patch
+import time
+import httpx
+import orjson
+from datetime import datetime
+from unittest.mock import AsyncMock, MagicMock, Mock, patch
+from PIL import Image
 
 from src.chatbot_document_validator.models.document_models import (
     DocumentType, 
@@ -12,25 +19,59 @@ from src.chatbot_document_validator.models.document_models import (
     ExtractedField,
     DocumentData,
     ValidationResult,
-    ProcessedDocument
+    ProcessedDocument,
+    ChatMessage,
+    ChatSession,
+    STATUS_UPPER,
+    STATUS_CSS
 )
 from src.chatbot_document_validator.utils.file_utils import FileProcessor
+from src.chatbot_document_validator.services.document_processor import (
+    DocumentProcessor,
+    AsyncDocumentProcessor
+)
+from src.chatbot_document_validator.services.cache_service import (
+    ProcessedDocumentCache,
+    ValidationCache,
+    ExtractionCache
+)
+from src.chatbot_document_validator.services.validation_service import (
+    DocumentValidationService,
+    MODEL_TIERS,
+    GROQ_TIMEOUT,
+    DATE_FIELDS,
+    _parse_date,
+    _parse_dates
+)
+from src.chatbot_document_validator.services.mindee_service import (
+    MindeeService,
+    _polling_delay,
+    POLLING_BASE_DELAY,
+    POLLING_JITTER
+)
 
 
 class TestDocumentModels:
     """Testes para os modelos de dados."""
     
-    def test_document_type_enum(self):
-        """Testa os tipos de documento."""
-        assert DocumentType.CNH == "cnh"
-        assert DocumentType.RG == "rg"
+    @pytest.mark.parametrize("member,expected", [
+        (DocumentType.CNH, "cnh"),
+        (DocumentType.RG, "rg"),
+        (ValidationStatus.VALID, "valid"),
+        (ValidationStatus.INVALID, "invalid"),
+        (ValidationStatus.WARNING, "warning"),
+        (ValidationStatus.ERROR, "error")
+    ])
+    def test_enum_values(self, member, expected):
+        """Testa os valores dos tipos de documento e dos status de validação."""
+        assert member.value == expected
     
-    def test_validation_status_enum(self):
-        """Testa os status de validação."""
-        assert ValidationStatus.VALID == "valid"
-        assert ValidationStatus.INVALID == "invalid"
-        assert ValidationStatus.WARNING == "warning"
-        assert ValidationStatus.ERROR == "error"
+    def test_status_display_tables(self):
+        """Testa os rótulos e classes CSS pré-calculados dos status."""
+        for status in ValidationStatus:
+            assert STATUS_UPPER[status] == status.value.upper()
+            assert status in STATUS_CSS
+        assert STATUS_CSS[ValidationStatus.VALID] == "status-valid"
     
     def test_extracted_field(self):
         """Testa o modelo ExtractedField."""
@@ -117,6 +158,24 @@ class TestDocumentModels:
         assert processed_doc.overall_status == ValidationStatus.WARNING
         assert len(processed_doc.all_warnings) == 1
         assert len(processed_doc.all_errors) == 0
+        assert processed_doc.upload_time.timestamp() == pytest.approx(processed_doc.upload_time_ns / 1e9, abs=1e-5)
+    
+    def test_legacy_timestamp_names(self):
+        """Testa que os nomes antigos dos campos de horário continuam aceitos."""
+        upload_time = datetime(2025, 1, 27, 10, 30, 15, 123456)
+        processed_doc = ProcessedDocument(
+            document_data=DocumentData(document_type=DocumentType.CNH),
+            validation_result=ValidationResult(is_valid=True),
+            file_name="cnh_teste.pdf",
+            upload_time=upload_time
+        )
+        message = ChatMessage(role="user", content="Olá", timestamp=upload_time.isoformat())
+        session = ChatSession(session_id="s1", created_at=upload_time)
+        
+        assert processed_doc.upload_time == upload_time
+        assert message.timestamp == upload_time
+        assert session.created_at == upload_time
+        assert session.updated_at > upload_time
 
 
 class TestFileProcessor:
@@ -141,23 +200,810 @@ class TestFileProcessor:
         assert FileProcessor.is_pdf_file("documento.pdf") is True
         assert FileProcessor.is_pdf_file("imagem.jpg") is False
     
-    def test_file_size_validation(self):
+    def test_file_size_validation(self, tmp_path):
         """Testa validação de tamanho de arquivo."""
-        # Cria arquivo temporário pequeno
-        with tempfile.NamedTemporaryFile(delete=False) as f:
-            f.write(b"test content")
-            temp_path = f.name
+        file_path = tmp_path / "arquivo.bin"
+        file_path.write_bytes(b"test content")
         
-        try:
-            assert FileProcessor.validate_file_size(temp_path) is True
-        finally:
-            os.unlink(temp_path)
+        assert FileProcessor.validate_file_size(str(file_path)) is True
+    
+    def test_file_info(self, tmp_path):
+        """Testa nome, tamanho e extensão retornados por get_file_info."""
+        file_path = tmp_path / "documento.PDF"
+        file_path.write_bytes(b"test content")
+        
+        assert FileProcessor.get_file_info(str(file_path)) == ("documento.PDF", 12, ".pdf")
+    
+    def test_resize_image_if_needed(self):
+        """Testa que só imagens acima do limite são redimensionadas e regravadas."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            small_path = os.path.join(temp_dir, "pequena.png")
+            large_path = os.path.join(temp_dir, "grande.jpg")
+            Image.new("RGB", (100, 50)).save(small_path)
+            Image.new("RGB", (400, 200)).save(large_path)
+            
+            assert FileProcessor.resize_image_if_needed(small_path, (200, 200)) == small_path
+            
+            resized_path = FileProcessor.resize_image_if_needed(large_path, (200, 200))
+            try:
+                assert resized_path != large_path
+                with Image.open(resized_path) as img:
+                    assert img.size == (200, 100)
+                    assert img.format == "JPEG"
+            finally:
+                os.unlink(resized_path)
     
     def test_document_type_inference(self):
         """Testa inferência de tipo de documento."""
         assert FileProcessor.get_document_type_from_filename("cnh_joao.pdf") == "cnh"
         assert FileProcessor.get_document_type_from_filename("rg_maria.jpg") == "rg"
         assert FileProcessor.get_document_type_from_filename("carteira_habilitacao.png") == "cnh"
+        assert FileProcessor.get_document_type_from_filename("registro_cnh.pdf") == "cnh"
+        assert FileProcessor.get_document_type_from_filename("IDENTIDADE.png") == "rg"
+    
+    def test_save_uploaded_file(self):
+        """Testa a validação e a cópia de um arquivo enviado pelo Streamlit."""
+        uploaded_file = io.BytesIO(b"%PDF-1.4 conteudo")
+        uploaded_file.name = "cnh.pdf"
+        uploaded_file.size = len(uploaded_file.getvalue())
+        
+        assert FileProcessor.validate_uploaded_file(uploaded_file)[0] is True
+        
+        temp_path = FileProcessor.save_uploaded_file(uploaded_file)
+        try:
+            with open(temp_path, "rb") as f:
+                assert f.read() == b"%PDF-1.4 conteudo"
+            assert uploaded_file.tell() == 0
+            assert os.path.basename(temp_path).endswith("_cnh.pdf")
+            
+            # Envios com o mesmo nome não colidem e ficam no mesmo diretório da sessão
+            second_path = FileProcessor.save_uploaded_file(uploaded_file)
+            assert second_path != temp_path
+            assert os.path.dirname(second_path) == os.path.dirname(temp_path)
+            FileProcessor.cleanup_temp_file(second_path)
+        finally:
+            FileProcessor.cleanup_temp_file(temp_path)
+        
+        assert not os.path.exists(temp_path)
+        assert os.path.isdir(os.path.dirname(temp_path))
+
+
+class TestProcessedDocumentCache:
+    """Testes para o cache de documentos processados."""
+    
+    def _make_document(self):
+        return ProcessedDocument(
+            document_data=DocumentData(document_type=DocumentType.CNH),
+            validation_result=ValidationResult(is_valid=True, confidence=0.9),
+            file_name="cnh_teste.pdf"
+        )
+    
+    def test_cache_roundtrip(self, tmp_path):
+        """Testa armazenamento e recuperação do cache."""
+        cache = ProcessedDocumentCache(str(tmp_path))
+        key = cache.make_key(b"conteudo", "cnh")
+        
+        assert cache.get(key) is None
+        
+        cache.put(key, self._make_document())
+        cached_doc = cache.get(key)
+        
+        assert cached_doc is not None
+        assert cached_doc.file_name == "cnh_teste.pdf"
+        assert cached_doc.validation_result.confidence == 0.9
+    
+    def test_cache_key_depends_on_type_and_content(self, tmp_path):
+        """Testa que a chave muda com o conteúdo e o tipo do documento."""
+        cache = ProcessedDocumentCache(str(tmp_path))
+        
+        assert cache.make_key(b"conteudo", "cnh") == cache.make_key(b"conteudo", "cnh")
+        assert cache.make_key(b"conteudo", "cnh") != cache.make_key(b"conteudo", "rg")
+        assert cache.make_key(b"conteudo", "cnh") != cache.make_key(b"outro", "cnh")
+    
+    def test_cache_discards_invalid_entry(self, tmp_path):
+        """Testa que entradas inválidas são descartadas."""
+        cache = ProcessedDocumentCache(str(tmp_path))
+        key = cache.make_key(b"conteudo", "cnh")
+        cache._path(key).write_text("{}")
+        
+        assert cache.get(key) is None
+        assert not cache._path(key).exists()
+    
+    def test_cache_put_reports_failure(self, tmp_path):
+        """Testa que uma falha de gravação é informada ao chamador, sem depender do Streamlit."""
+        cache_dir = tmp_path / "processed"
+        cache = ProcessedDocumentCache(str(cache_dir))
+        key = cache.make_key(b"conteudo", "cnh")
+        
+        assert cache.put(key, self._make_document()) is True
+        
+        cache._path(key).unlink()
+        cache_dir.rmdir()
+        assert cache.put(key, self._make_document()) is False
+    
+    def test_cache_files_are_private(self, tmp_path):
+        """Testa que o diretório e as entradas do cache só são acessíveis ao dono."""
+        cache_dir = tmp_path / "processed"
+        cache = ProcessedDocumentCache(str(cache_dir))
+        key = cache.make_key(b"conteudo", "cnh")
+        cache.put(key, self._make_document())
+        
+        assert cache_dir.stat().st_mode & 0o777 == 0o700
+        assert cache._path(key).stat().st_mode & 0o777 == 0o600
+    
+    def test_cache_expires_entries(self, tmp_path):
+        """Testa que entradas mais antigas que o TTL são descartadas."""
+        cache = ProcessedDocumentCache(str(tmp_path), ttl_seconds=60)
+        key = cache.make_key(b"conteudo", "cnh")
+        cache.put(key, self._make_document())
+        old_time = time.time() - 120
+        os.utime(cache._path(key), (old_time, old_time))
+        
+        assert cache.get(key) is None
+        assert not cache._path(key).exists()
+    
+    def test_cache_evicts_first_written_entries(self, tmp_path):
+        """Testa o limite de entradas: as gravadas há mais tempo são removidas (FIFO)."""
+        cache = ProcessedDocumentCache(str(tmp_path), max_entries=2)
+        keys = [cache.make_key(content, "cnh") for content in (b"a", b"b", b"c")]
+        for age, key in zip((30, 20, 10), keys):
+            cache.put(key, self._make_document())
+            entry_time = time.time() - age
+            os.utime(cache._path(key), (entry_time, entry_time))
+        cache._evict()
+        
+        assert cache.get(keys[0]) is None
+        assert cache.get(keys[1]) is not None
+        assert cache.get(keys[2]) is not None
+
+
+class TestValidationCache:
+    """Testes para o cache de resultados de validação."""
+    
+    def test_key_ignores_field_order(self):
+        """Testa que a chave não depende da ordem dos campos."""
+        key_a = ValidationCache.make_key({"nome": "JOAO", "cpf": "123"}, "cnh")
+        key_b = ValidationCache.make_key({"cpf": "123", "nome": "JOAO"}, "cnh")
+        
+        assert key_a == key_b
+        assert key_a != ValidationCache.make_key({"nome": "JOAO", "cpf": "123"}, "rg")
+    
+    def test_lru_eviction(self):
+        """Testa o descarte do resultado menos usado recentemente."""
+        cache = ValidationCache(max_size=2)
+        cache.put("a", {"is_valid": True})
+        cache.put("b", {"is_valid": False})
+        
+        assert cache.get("a") == {"is_valid": True}
+        
+        cache.put("c", {"is_valid": True})
+        
+        assert len(cache) == 2
+        assert cache.get("b") is None
+        assert cache.get("a") is not None
+    
+    def test_sessions_share_service_with_own_caches(self):
+        """Testa que sessões com a mesma chave compartilham o serviço, mas não o cache."""
+        caches = [ValidationCache(), ValidationCache()]
+        processors = [DocumentProcessor("mindee_key", "groq_key_sessoes", cache) for cache in caches]
+        service = processors[0].validation_service
+        fields = {"extracted_fields": {"nome": "JOAO SILVA", "cpf": "111.111.111-11"}}
+        
+        assert processors[1].validation_service is service
+        
+        processors[0]._process_analyzed_document(
+            {"filename": "cnh.pdf", "file_size": 10}, lambda doc_type: {**fields, "document_type": "cnh"},
+            "cnh", False, 0.0
+        )
+        
+        assert len(caches[0]) == 1
+        assert len(caches[1]) == 0
+        assert service.validation_cache is None
+
+
+class TestExtractionCache:
+    """Testes para o cache de extrações do Mindee."""
+    
+    def test_file_key_matches_bytes_key(self, tmp_path):
+        """Testa que arquivo e conteúdo em memória geram a mesma chave."""
+        file_path = tmp_path / "documento.pdf"
+        file_path.write_bytes(b"conteudo" * 10000)
+        temp_path = str(file_path)
+        
+        assert ExtractionCache.make_file_key(temp_path, "cnh") == ExtractionCache.make_key(b"conteudo" * 10000, "cnh")
+        assert ExtractionCache.make_file_key(temp_path, "cnh") != ExtractionCache.make_key(b"conteudo" * 10000, "rg")
+    
+    def test_repeated_extraction_skips_api(self):
+        """Testa que o mesmo conteúdo não é reenviado ao Mindee."""
+        service = MindeeService("fake_api_key")
+        raw_data = {"inference": {"result": {"fields": {"name": {"value": "JOAO"}}}}}
+        
+        with patch.object(service, "send_bytes_with_polling", return_value=raw_data) as mock_send:
+            first = service.extract_document_data_from_bytes(b"conteudo", "cnh.pdf", "cnh")
+            second = service.extract_document_data_from_bytes(b"conteudo", "outro.pdf", "cnh")
+        
+        assert mock_send.call_count == 1
+        assert first == second
+        assert second["extracted_fields"]["nome"] == "JOAO"
+
+
+class TestCpfValidation:
+    """Testes para a validação de CPF."""
+    
+    def setup_method(self):
+        """Configuração para cada teste."""
+        self.validation_service = DocumentValidationService("fake_api_key")
+    
+    def test_valid_cpf(self):
+        """Testa CPFs válidos, com e sem formatação."""
+        assert self.validation_service._is_valid_cpf("188.433.327-32") is True
+        assert self.validation_service._is_valid_cpf("18843332732") is True
+    
+    def test_invalid_cpf(self):
+        """Testa CPFs inválidos."""
+        assert self.validation_service._is_valid_cpf("188.433.327-33") is False
+        assert self.validation_service._is_valid_cpf("111.111.111-11") is False
+        assert self.validation_service._is_valid_cpf("123") is False
+        assert self.validation_service._is_valid_cpf("") is False
+
+
+class TestSpecificFieldValidation:
+    """Testes para as validações determinísticas de campos."""
+    
+    def setup_method(self):
+        """Configuração para cada teste."""
+        self.validation_service = DocumentValidationService("fake_api_key")
+    
+    def test_cnh_registration_number(self):
+        """Testa o número de registro da CNH com e sem formatação."""
+        for numero in ("07450883117", "074.508.831-17"):
+            result = self.validation_service._validate_cnh_specific_fields({"numero_registro": numero})
+            assert result["cnh_specific_warnings"] == []
+        
+        result = self.validation_service._validate_cnh_specific_fields({"numero_registro": "123"})
+        assert len(result["cnh_specific_warnings"]) == 1
+    
+    def test_cnh_category(self):
+        """Testa as categorias de CNH, ignorando espaços e caixa."""
+        assert self.validation_service._is_valid_cnh_category(" ab ") is True
+        assert self.validation_service._is_valid_cnh_category("ACC") is True
+        assert self.validation_service._is_valid_cnh_category("F") is False
+        assert self.validation_service._is_valid_cnh_category("") is False
+    
+    def test_rg_format(self):
+        """Testa o formato básico de RG."""
+        assert self.validation_service._is_valid_rg_format("4.021.923 - ES") is True
+        assert self.validation_service._is_valid_rg_format("123") is False
+        assert self.validation_service._is_valid_rg_format("1111111") is False
+    
+    @pytest.mark.parametrize("validade,error,warning", [
+        ("2070-01-27", False, False),
+        ("2025-1-5", False, True),
+        ("2020-01-27", False, True),
+        ("2025-13-01", True, False),
+        ("27/01/2070", True, False),
+        ("1800-01-01", True, False)
+    ])
+    def test_dates(self, validade, error, warning):
+        """Testa a validação e o vencimento de datas yyyy-mm-dd, com e sem datas pré-convertidas."""
+        fields = {"data_validade": validade}
+        
+        for dates in (None, _parse_dates(fields, DATE_FIELDS["cnh"])):
+            result = self.validation_service._validate_cnh_specific_fields(fields, dates)
+            assert ("Data de validade inválida" in result["cnh_specific_errors"]) is error
+            assert ("CNH está vencida" in result["cnh_specific_warnings"]) is warning
+    
+    def test_model_tier_selection(self):
+        """Testa que apenas documentos completos e sem problemas usam o modelo instantâneo."""
+        fields = {
+            "nome": "JOAO SILVA",
+            "cpf": "188.433.327-32",
+            "numero_registro": "07450883117",
+            "categoria": "B",
+            "data_nascimento": "1990-05-02",
+            "data_emissao": "2025-01-27",
+            "data_validade": "2035-01-27",
+            "data_primeira_habilitacao": "2010-08-07"
+        }
+        
+        _, model, _, _ = self.validation_service._prepare_validation(fields, "cnh")
+        assert model == MODEL_TIERS["instant"]
+        
+        _, model, _, _ = self.validation_service._prepare_validation({**fields, "categoria": "Z"}, "cnh")
+        assert model == MODEL_TIERS["balanced"]
+        
+        _, model, _, _ = self.validation_service._prepare_validation({**fields, "data_primeira_habilitacao": None}, "cnh")
+        assert model == MODEL_TIERS["balanced"]
+    
+    def test_parse_date_formats(self):
+        """Testa a conversão de datas ISO e brasileiras no pré-processamento."""
+        assert _parse_date("2025-01-27") == datetime(2025, 1, 27)
+        assert _parse_date("27/01/2025") == datetime(2025, 1, 27)
+        assert _parse_date("2025-1-5") == datetime(2025, 1, 5)
+        assert _parse_date("2025-13-01") is None
+        assert _parse_date("27.01.2025") is None
+    
+    def test_preprocess_uses_reference_time(self):
+        """Testa que o pré-processamento usa o instante de referência informado."""
+        now = datetime(2025, 6, 1)
+        fields = {
+            "data_nascimento": "2000-05-02",
+            "data_emissao": "2025-01-27",
+            "data_validade": "2025-05-27"
+        }
+        
+        processed = self.validation_service.preprocess_cnh_data(fields, now)
+        
+        assert processed["idade_atual"] == 25
+        assert processed["dias_para_vencimento"] == -5
+        assert processed["esta_vencida"] is True
+    
+    def test_specific_fields_reuse_preprocessed_dates(self):
+        """Testa que as datas convertidas no pré-processamento dão o mesmo resultado."""
+        for validade in ("2099-01-27", "2020-01-27", "2025-1-5", "27/01/2099", "1800-01-01", "2025-13-01"):
+            fields = {"data_validade": validade}
+            dates = _parse_dates(fields, DATE_FIELDS["cnh"])
+            assert (
+                self.validation_service._validate_cnh_specific_fields(fields, dates)
+                == self.validation_service._validate_cnh_specific_fields(fields)
+            )
+    
+    def test_rg_prompt_preprocesses_once(self):
+        """Testa que o prompt do RG usa os dados já pré-processados."""
+        fields = {"nome": "MARIA", "data_nascimento": "2001-02-05", "data_emissao": "2020-02-07"}
+        
+        with patch.object(
+            self.validation_service, "preprocess_rg_data", wraps=self.validation_service.preprocess_rg_data
+        ) as mock_preprocess:
+            prompt, _, _, _ = self.validation_service._prepare_validation(fields, "rg")
+        
+        assert mock_preprocess.call_count == 1
+        assert '"nascimento_anterior_emissao":true' in prompt
+    
+    def test_unparseable_response_is_not_cached(self):
+        """Testa que uma resposta malformada do Groq não fica no cache de validações."""
+        cache = ValidationCache()
+        service = DocumentValidationService("fake_api_key", cache)
+        document = {"extracted_fields": {"nome": "MARIA OLIVEIRA"}}
+        
+        with patch.object(service, "_call_groq", side_effect=["resposta sem JSON", '{"is_valid": true}']) as mock_call:
+            first = service.validate_document(document, "rg")
+            second = service.validate_document(document, "rg")
+        
+        assert mock_call.call_count == 2
+        assert first["errors"] and first["completed"] is False
+        assert second["is_valid"] is True
+        assert len(cache) == 1
+    
+    def test_hard_errors_skip_groq(self):
+        """Testa que documentos reprovados pelas regras determinísticas não chamam o Groq."""
+        documents = [
+            {"nome": "JOAO SILVA", "cpf": "111.111.111-11"},
+            {"nome": "JOAO SILVA", "data_nascimento": "2030-01-01", "data_emissao": "2025-01-27"}
+        ]
+        
+        with patch.object(self.validation_service, "_call_groq") as mock_call:
+            results = [
+                self.validation_service.validate_document({"extracted_fields": fields}, "cnh")
+                for fields in documents
+            ]
+        
+        mock_call.assert_not_called()
+        assert all(result["is_valid"] is False for result in results)
+        assert "CPF inválido" in results[0]["cnh_specific_errors"]
+        assert results[1]["errors"] == ["Data de nascimento posterior à data de emissão"]
+
+
+class TestGroqResponseCache:
+    """Testes para o cache de respostas do Groq."""
+    
+    @staticmethod
+    def _stream(*parts):
+        """Simula o stream de uma resposta do Groq com os trechos informados."""
+        stream = MagicMock()
+        stream.__iter__.return_value = iter([Mock(choices=[Mock(delta=Mock(content=part))]) for part in parts])
+        return stream
+    
+    def test_identical_prompt_reuses_response(self):
+        """Testa que prompts idênticos chamam a API uma única vez."""
+        service = DocumentValidationService("fake_api_key")
+        
+        with patch.object(
+            service.client.chat.completions, "create",
+            side_effect=lambda **kwargs: self._stream('{"is_valid":', ' true}')
+        ) as mock_create:
+            assert service._call_groq("prompt") == '{"is_valid": true}'
+            assert service._call_groq("prompt") == '{"is_valid": true}'
+            service._call_groq("outro prompt")
+        
+        assert mock_create.call_count == 2
+    
+    @pytest.mark.parametrize("parts", [
+        ('{"is_valid": true, "analysis": "resposta cortada',),
+        ("Não foi possível validar o documento.",),
+        ("{is_valid: true}",)
+    ], ids=["truncada", "sem-json", "json-invalido"])
+    def test_incomplete_response_is_not_cached(self, parts):
+        """Testa que respostas sem um objeto JSON completo não são reaproveitadas."""
+        service = DocumentValidationService("fake_api_key")
+        
+        with patch.object(
+            service.client.chat.completions, "create",
+            side_effect=lambda **kwargs: self._stream(*parts)
+        ) as mock_create:
+            service._call_groq("prompt")
+            service._call_groq("prompt")
+        
+        assert mock_create.call_count == 2
+    
+    def test_stream_stops_at_end_of_json(self):
+        """Testa que o stream é encerrado quando o objeto JSON se fecha."""
+        service = DocumentValidationService("fake_api_key")
+        stream = self._stream('Resultado: {"is_valid": false, ', '"analysis": "chave } em texto"}', ' Fim.', ' Ignorado.')
+        
+        with patch.object(service.client.chat.completions, "create", return_value=stream):
+            content = service._call_groq("prompt")
+        
+        assert content == '{"is_valid": false, "analysis": "chave } em texto"}'
+        stream.close.assert_called_once()
+        assert service._parse_validation_response(content)["analysis"] == "chave } em texto"
+    
+    def test_validate_many_bounds_concurrency(self):
+        """Testa que as validações simultâneas respeitam o limite e preservam a ordem."""
+        service = DocumentValidationService("fake_api_key")
+        documents = [({"extracted_fields": {"nome": f"PESSOA {i}"}}, "rg") for i in range(5)]
+        in_flight = {"current": 0, "max": 0}
+        
+        async def fake_acall(prompt, aclient, **kwargs):
+            in_flight["current"] += 1
+            in_flight["max"] = max(in_flight["max"], in_flight["current"])
+            await asyncio.sleep(0.01)
+            in_flight["current"] -= 1
+            return '{"is_valid": true, "confidence": 0.9}'
+        
+        with patch.object(service, "_acall_groq", side_effect=fake_acall) as mock_acall:
+            results = asyncio.run(service.validate_many(documents, max_concurrency=2))
+        
+        assert mock_acall.call_count == 5
+        assert in_flight["max"] == 2
+        assert all(result["is_valid"] for result in results)
+        # Um único cliente do Groq por execução, compartilhado por todas as chamadas
+        assert len({id(call.args[1]) for call in mock_acall.call_args_list}) == 1
+    
+    def test_async_groq_client_has_own_timeout(self):
+        """Testa que o cliente assíncrono do Groq usa o timeout do Groq, não o do Mindee."""
+        service = DocumentValidationService("fake_api_key")
+        aclient = service.create_async_groq_client()
+        
+        try:
+            assert aclient.timeout == GROQ_TIMEOUT
+            assert aclient._client.timeout.read == GROQ_TIMEOUT
+        finally:
+            asyncio.run(aclient.close())
+
+
+class TestGroqBatch:
+    """Testes para a validação em lote pela Batch API do Groq."""
+    
+    def test_batch_maps_results_by_custom_id(self):
+        """Testa o envio do lote e a associação das respostas aos documentos."""
+        service = DocumentValidationService("fake_api_key")
+        documents = [
+            ({"extracted_fields": {"nome": "JOAO", "cpf": "188.433.327-32"}}, "cnh"),
+            ({"extracted_fields": {}}, "passaporte"),
+            ({"extracted_fields": {"nome": "MARIA", "cpf": "111.111.111-11"}}, "rg")
+        ]
+        output = (
+            b'{"custom_id": "2", "response": {"body": {"choices": [{"message": {"content": "{\\"is_valid\\": false}"}}]}}}\n'
+            b'{"custom_id": "0", "response": {"body": {"choices": [{"message": {"content": "{\\"is_valid\\": true}"}}]}}}\n'
+        )
+        
+        with patch.object(service.client.files, "create", return_value=Mock(id="file-1")) as mock_upload, \
+             patch.object(service.client.batches, "create", return_value=Mock(id="batch-1", status="validating")), \
+             patch.object(service.client.batches, "retrieve", return_value=Mock(status="completed", output_file_id="file-2")), \
+             patch.object(service.client.files, "content", return_value=Mock(read=Mock(return_value=output))), \
+             patch("src.chatbot_document_validator.services.validation_service.time.sleep") as mock_sleep:
+            results = service.validate_documents_batch(documents)
+        
+        # O RG com CPF inválido é reprovado localmente e não entra no lote
+        uploaded = mock_upload.call_args.kwargs["file"][1]
+        assert len(uploaded.splitlines()) == 1
+        assert b'"response_format":{"type":"json_object"}' in uploaded
+        assert mock_sleep.call_count == 1
+        
+        assert results[0]["is_valid"] is True
+        assert results[0]["cnh_specific_errors"] == []
+        assert results[1]["is_valid"] is False
+        assert results[2]["is_valid"] is False
+        assert results[2]["confidence"] == 1.0
+        assert "CPF inválido" in results[2]["rg_specific_errors"]
+
+    
+    def test_batch_timeout_cancels_and_returns_per_document_errors(self):
+        """Testa que um lote travado é cancelado no prazo e cada documento recebe um erro."""
+        service = DocumentValidationService("fake_api_key")
+        documents = [
+            ({"extracted_fields": {"nome": "JOAO", "cpf": "188.433.327-32"}}, "cnh"),
+            ({"extracted_fields": {"nome": "MARIA", "cpf": "111.111.111-11"}}, "rg")
+        ]
+        clock = iter([0.0, 0.0, 50.0, 100.0])
+        
+        with patch.object(service.client.files, "create", return_value=Mock(id="file-1")), \
+             patch.object(service.client.batches, "create", return_value=Mock(id="batch-1", status="validating")), \
+             patch.object(service.client.batches, "retrieve", return_value=Mock(id="batch-1", status="in_progress")), \
+             patch.object(service.client.batches, "cancel") as mock_cancel, \
+             patch("src.chatbot_document_validator.services.validation_service.time.monotonic", side_effect=lambda: next(clock)), \
+             patch("src.chatbot_document_validator.services.validation_service.time.sleep") as mock_sleep, \
+             patch("src.chatbot_document_validator.services.validation_service.st"):
+            results = service.validate_documents_batch(documents, timeout=100)
+        
+        mock_cancel.assert_called_once_with("batch-1")
+        assert mock_sleep.call_count == 2
+        assert results[0]["is_valid"] is False
+        assert results[0]["completed"] is False
+        assert "Timeout" in results[0]["errors"][0]
+        # A rejeição local do RG não depende do lote
+        assert "CPF inválido" in results[1]["rg_specific_errors"]
+
+class TestDocumentProcessorPipeline:
+    """Testes para o processamento concorrente e em lote de documentos, com serviços mockados."""
+    
+    @staticmethod
+    def _make_processor(fake_extract):
+        """DocumentProcessor com o Mindee e o Groq substituídos por mocks."""
+        processor = DocumentProcessor("mindee_key", "groq_key")
+        processor.mindee_service = Mock(extract_document_data_from_bytes_async=fake_extract)
+        processor.validation_service = MagicMock()
+        processor.validation_service.validate_document_async = AsyncMock(
+            return_value={"is_valid": True, "confidence": 0.8}
+        )
+        return processor
+    
+    @staticmethod
+    def _extracted(filename, document_type):
+        return {
+            "document_type": document_type,
+            "extracted_fields": {"nome": {"value": filename, "confidence": 0.9}},
+            "confidence": 0.9
+        }
+    
+    def test_process_many_order_errors_concurrency_and_progress(self):
+        """Testa ordem dos resultados, exceção por documento, limite de concorrência e progresso."""
+        filenames = ["cnh_1.pdf", "cnh_2.pdf", "rg_falha.pdf", "rg_4.pdf", "cnh_5.pdf"]
+        in_flight = {"current": 0, "max": 0}
+        
+        async def fake_extract(data, filename, document_type, client):
+            in_flight["current"] += 1
+            in_flight["max"] = max(in_flight["max"], in_flight["current"])
+            try:
+                # Os primeiros documentos terminam por último
+                await asyncio.sleep(0.01 * (len(filenames) - filenames.index(filename)))
+                if "falha" in filename:
+                    raise RuntimeError("Falha no Mindee")
+                return self._extracted(filename, document_type)
+            finally:
+                in_flight["current"] -= 1
+        
+        processor = self._make_processor(fake_extract)
+        progress = []
+        
+        results = AsyncDocumentProcessor(processor, max_concurrency=2).process_documents(
+            [(b"conteudo", filename) for filename in filenames],
+            on_complete=lambda completed, total: progress.append((completed, total))
+        )
+        
+        assert in_flight["max"] == 2
+        assert isinstance(results[2], RuntimeError)
+        assert [result.file_name for i, result in enumerate(results) if i != 2] == [
+            filename for i, filename in enumerate(filenames) if i != 2
+        ]
+        assert results[3].document_data.document_type == DocumentType.RG
+        assert progress == [(completed, len(filenames)) for completed in range(1, len(filenames) + 1)]
+        assert processor.validation_service.validate_document_async.await_count == 4
+    
+    def test_process_document_uses_original_filename(self, tmp_path):
+        """Testa que o nome original, e não o do arquivo temporário, chega ao Mindee e ao resultado."""
+        temp_path = tmp_path / "3f2a9c_cnh_joao.pdf"
+        temp_path.write_bytes(b"conteudo")
+        processor = DocumentProcessor("mindee_key", "groq_key")
+        processor.mindee_service = Mock()
+        processor.mindee_service.extract_document_data.return_value = self._extracted("cnh_joao.pdf", "cnh")
+        processor.validation_service = Mock()
+        processor.validation_service.validate_document.return_value = {"is_valid": True, "confidence": 0.9}
+        
+        result = processor.process_document(str(temp_path), filename="cnh_joao.pdf")
+        
+        processor.mindee_service.extract_document_data.assert_called_once_with(
+            str(temp_path), "cnh", "cnh_joao.pdf"
+        )
+        assert result.file_name == "cnh_joao.pdf"
+    
+    def test_transient_validation_error_is_marked_incomplete(self):
+        """Testa que uma falha do Groq gera resultado marcado como não concluído (fora do cache em disco)."""
+        processor = DocumentProcessor("mindee_key", "groq_key_incompleto")
+        extracted = self._extracted("rg_maria.pdf", "rg")
+        
+        with patch.object(processor.validation_service, "_call_groq", side_effect=RuntimeError("timeout")):
+            result = processor._process_analyzed_document(
+                {"filename": "rg_maria.pdf", "file_size": 10}, lambda doc_type: extracted, "rg", False, 0.0
+            )
+        
+        assert result.validation_result.is_valid is False
+        assert result.validation_result.completed is False
+    
+    def test_process_documents_batch_keeps_order_and_errors(self, tmp_path):
+        """Testa que o lote valida só os documentos extraídos e preserva a ordem."""
+        paths = []
+        for filename in ("cnh_1.pdf", "documento.txt", "rg_2.jpg"):
+            path = tmp_path / filename
+            path.write_bytes(b"conteudo")
+            paths.append(str(path))
+        
+        async def fake_extract(data, filename, document_type, client):
+            return self._extracted(filename, document_type)
+        
+        processor = self._make_processor(fake_extract)
+        processor.validation_service.validate_documents_batch = Mock(return_value=[
+            {"is_valid": True, "confidence": 0.9},
+            {"is_valid": False, "confidence": 0.7, "errors": ["Data inválida"]}
+        ])
+        
+        results = processor.process_documents_batch(paths)
+        
+        batch = processor.validation_service.validate_documents_batch.call_args.args[0]
+        assert [document_type for _, document_type in batch] == ["cnh", "rg"]
+        assert results[0].file_name == "cnh_1.pdf"
+        assert results[0].validation_result.is_valid is True
+        assert isinstance(results[1], ValueError)
+        assert results[2].file_name == "rg_2.jpg"
+        assert results[2].validation_result.errors == ["Data inválida"]
+
+
+class TestMindeePolling:
+    """Testes para o intervalo de polling do Mindee."""
+    
+    def test_backoff_is_capped(self):
+        """Testa o crescimento exponencial limitado ao intervalo máximo."""
+        assert POLLING_BASE_DELAY <= _polling_delay(0, 4.0) <= POLLING_BASE_DELAY + POLLING_JITTER
+        assert _polling_delay(20, 4.0) <= 4.0 + POLLING_JITTER
+    
+    def test_retry_after_is_honored(self):
+        """Testa o uso do cabeçalho Retry-After quando numérico."""
+        assert _polling_delay(0, 4.0, "7") == 7.0
+        assert _polling_delay(0, 4.0, "Wed, 21 Oct 2015 07:28:00 GMT") <= POLLING_BASE_DELAY + POLLING_JITTER
+
+
+class TestMindeePollingFlow:
+    """Testes para o envio e o polling do Mindee, com as respostas HTTP mockadas."""
+    
+    POLLING_URL = "https://api-v2.mindee.net/v2/jobs/job-1"
+    RESULT_URL = "https://results.mindee.example/v2/inferences/job-1"
+    RESULT = {"inference": {"result": {"fields": {"name": {"value": "JOAO SILVA"}}}}}
+    
+    @staticmethod
+    def _response(payload=None, history=(), ok=True, url=None):
+        """Simula um requests.Response."""
+        return Mock(
+            content=orjson.dumps(payload or {}),
+            history=list(history),
+            ok=ok,
+            url=url,
+            headers={}
+        )
+    
+    def _run_sync(self, poll_responses):
+        """Executa o polling síncrono com as respostas de GET informadas."""
+        service = MindeeService("fake_api_key")
+        enqueue = self._response({"job": {"polling_url": self.POLLING_URL}})
+        
+        with patch.object(service.session, "post", return_value=enqueue), \
+             patch.object(service.session, "get", side_effect=poll_responses) as mock_get, \
+             patch("src.chatbot_document_validator.services.mindee_service.time.sleep"):
+            result = service.send_bytes_with_polling(b"conteudo", "cnh.pdf", "cnh")
+        
+        return service, result, mock_get
+    
+    def test_sync_follows_redirect_to_result(self):
+        """Testa o resultado obtido diretamente pelo redirecionamento do polling."""
+        _, result, mock_get = self._run_sync([
+            self._response(self.RESULT, history=[Mock()], url=self.RESULT_URL)
+        ])
+        
+        assert result == self.RESULT
+        assert mock_get.call_count == 1
+    
+    def test_sync_refetches_with_auth_after_cross_host_redirect(self):
+        """Testa a nova busca autenticada quando o redirecionamento perde o cabeçalho."""
+        service, result, mock_get = self._run_sync([
+            self._response(history=[Mock()], ok=False, url=self.RESULT_URL),
+            self._response(self.RESULT, url=self.RESULT_URL)
+        ])
+        
+        assert result == self.RESULT
+        assert mock_get.call_args_list[1] == ((self.RESULT_URL,), {"headers": service.headers})
+    
+    def test_sync_falls_back_to_result_url(self):
+        """Testa o uso de result_url quando o job concluído não redireciona."""
+        _, result, mock_get = self._run_sync([
+            self._response({"job": {"status": "Processing"}}),
+            self._response({"job": {"status": "Processed", "result_url": self.RESULT_URL}}),
+            self._response(self.RESULT)
+        ])
+        
+        assert result == self.RESULT
+        assert mock_get.call_args_list[-1].args == (self.RESULT_URL,)
+    
+    def test_send_file_accepts_deprecated_polling_kwargs(self, tmp_path):
+        """Testa que max_retries/polling_interval ainda são aceitos, com aviso de obsolescência."""
+        file_path = tmp_path / "cnh.pdf"
+        file_path.write_bytes(b"conteudo")
+        service = MindeeService("fake_api_key")
+        
+        with patch.object(service, "_send_with_polling", return_value=self.RESULT) as mock_send:
+            with pytest.warns(DeprecationWarning):
+                result = service.send_file_with_polling(str(file_path), "cnh", max_retries=30, polling_interval=2)
+        
+        assert result == self.RESULT
+        assert mock_send.call_args.args[3:] == (60, 2)
+    
+    def test_unknown_document_type_fails_before_upload(self):
+        """Testa que um tipo sem model ID falha com erro claro, sem enviar o arquivo."""
+        service = MindeeService("fake_api_key")
+        
+        with patch.object(service.session, "post") as mock_post:
+            with pytest.raises(ValueError, match="Tipo de documento não suportado"):
+                service.send_bytes_with_polling(b"conteudo", "documento.pdf", "Não reconhecido")
+        
+        mock_post.assert_not_called()
+    
+    def _run_async(self, poll_handler):
+        """Executa o polling assíncrono sobre um httpx.MockTransport."""
+        service = MindeeService("fake_api_key")
+        requests_seen = []
+        
+        def handler(request):
+            requests_seen.append(request)
+            if request.method == "POST":
+                return httpx.Response(200, json={"job": {"polling_url": self.POLLING_URL}})
+            if str(request.url) == self.RESULT_URL:
+                # O host de resultados exige autenticação
+                if request.headers.get("Authorization") != service.api_key:
+                    return httpx.Response(401)
+                return httpx.Response(200, json=self.RESULT)
+            return poll_handler(request)
+        
+        async def run():
+            async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+                return await service.send_bytes_with_polling_async(b"conteudo", "cnh.pdf", "cnh", client)
+        
+        with patch("src.chatbot_document_validator.services.mindee_service.asyncio.sleep", new=AsyncMock()):
+            result = asyncio.run(run())
+        
+        return result, requests_seen
+    
+    def test_async_refetches_with_auth_after_cross_host_redirect(self):
+        """Testa o redirecionamento para outro host, que descarta a autenticação."""
+        result, requests_seen = self._run_async(
+            lambda request: httpx.Response(302, headers={"Location": self.RESULT_URL})
+        )
+        
+        assert result == self.RESULT
+        result_requests = [request for request in requests_seen if str(request.url) == self.RESULT_URL]
+        assert [request.headers.get("Authorization") for request in result_requests] == [None, "fake_api_key"]
+    
+    def test_async_falls_back_to_result_url(self):
+        """Testa o uso de result_url quando o job concluído não redireciona."""
+        statuses = iter(["Processing", "Processed"])
+        
+        def poll(request):
+            return httpx.Response(200, json={"job": {"status": next(statuses), "result_url": self.RESULT_URL}})
+        
+        result, requests_seen = self._run_async(poll)
+        
+        assert result == self.RESULT
+        assert [str(request.url) for request in requests_seen[1:]] == [
+            self.POLLING_URL, self.POLLING_URL, self.RESULT_URL
+        ]
 
 
 class TestMockServices:
@@ -167,8 +1013,7 @@ class TestMockServices:
     def test_mindee_service_mock(self, mock_mindee):
         """Testa serviço Mindee mockado."""
         # Configura mock
-        mock_instance = Mock()
-        mock_instance.extract_document_data.return_value = {
+        mock_mindee.return_value.extract_document_data.return_value = {
             "document_type": "cnh",
             "extracted_fields": {
                 "nome": {"value": "João Silva", "confidence": 0.95},
@@ -176,7 +1021,6 @@ class TestMockServices:
             },
             "confidence": 0.92
         }
-        mock_mindee.return_value = mock_instance
         
         # Testa chamada
         service = mock_mindee("fake_api_key")
@@ -190,8 +1034,7 @@ class TestMockServices:
     def test_validation_service_mock(self, mock_validation):
         """Testa serviço de validação mockado."""
         # Configura mock
-        mock_instance = Mock()
-        mock_instance.validate_document.return_value = {
+        mock_validation.return_value.validate_document.return_value = {
             "is_valid": True,
             "confidence": 0.85,
             "errors": [],
@@ -199,7 +1042,6 @@ class TestMockServices:
             "analysis": "Documento válido",
             "recommendations": []
         }
-        mock_validation.return_value = mock_instance
         
         # Testa chamada
         service = mock_validation("fake_api_key")
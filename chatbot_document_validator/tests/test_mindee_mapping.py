@@ -2,14 +2,10 @@
 Testes para verificar o mapeamento correto dos campos do Mindee.
 """
 import pytest
-import sys
-import os
-
-# Adiciona o diretório src ao path
-sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+import re
 
 from chatbot_document_validator.services.mindee_service import MindeeService
-from chatbot_document_validator.examples.sample_data import (
+from examples.sample_data import (
     SAMPLE_CNH_RESPONSE, 
     SAMPLE_RG_RESPONSE,
     EXPECTED_CNH_FIELDS,
@@ -17,149 +13,115 @@ from chatbot_document_validator.examples.sample_data import (
 )
 
 
+# Formato de data esperado nos campos extraídos
+DATE_RE = re.compile(r"\d{4}-\d{2}-\d{2}")
+
+
+def mindee_response(result):
+    """Envolve o resultado de exemplo no formato de resposta da API v2 do Mindee."""
+    return {"inference": {"result": result}}
+
+
+# Serviço e campos de exemplo extraídos uma única vez, na importação do módulo
+_SERVICE = MindeeService("fake_api_key")
+_SAMPLE_FIELDS = {
+    "cnh": _SERVICE._extract_cnh_fields(mindee_response(SAMPLE_CNH_RESPONSE))["extracted_fields"],
+    "rg": _SERVICE._extract_rg_fields(mindee_response(SAMPLE_RG_RESPONSE))["extracted_fields"]
+}
+
+
+@pytest.fixture(scope="session")
+def mindee_service():
+    """Serviço Mindee compartilhado; os testes usam apenas métodos sem estado."""
+    return _SERVICE
+
+
+@pytest.fixture
+def cnh_fields():
+    """Campos extraídos da CNH de exemplo."""
+    return _SAMPLE_FIELDS["cnh"]
+
+
+@pytest.fixture
+def rg_fields():
+    """Campos extraídos do RG de exemplo."""
+    return _SAMPLE_FIELDS["rg"]
+
+
 class TestMindeeMapping:
     """Testes para mapeamento de campos do Mindee."""
     
-    def setup_method(self):
-        """Configuração para cada teste."""
-        self.mindee_service = MindeeService("fake_api_key")
-    
-    def test_cnh_field_mapping(self):
+    @pytest.mark.parametrize("key,expected", list(EXPECTED_CNH_FIELDS.items()))
+    def test_cnh_field_mapping(self, cnh_fields, key, expected):
         """Testa mapeamento de campos da CNH."""
-        # Simula dados extraídos da CNH
-        extracted_data = {
-            "raw_response": SAMPLE_CNH_RESPONSE,
-            "document_type": "cnh",
-            "extracted_fields": {},
-            "confidence": 0.95
-        }
-        
-        # Chama o método de extração
-        fields = self.mindee_service._extract_cnh_fields(SAMPLE_CNH_RESPONSE)
-        
-        # Verifica se os campos foram mapeados corretamente
-        assert fields["nome"] == "GUILHERME FIRME FIOROT"
-        assert fields["cpf"] == "188.433.327-32"
-        assert fields["categoria"] == "B"
-        assert fields["data_emissao"] == "2025-01-27"
-        assert fields["data_validade"] == "2035-01-27"
-        assert fields["data_nascimento"] == "2001-05-02"
-        assert fields["numero_registro"] == "07450883117"
-        assert fields["orgao_emissor"] == "SPTC ES"
-        assert fields["data_primeira_habilitacao"] == "2020-08-07"
+        assert cnh_fields[key] == expected
     
-    def test_rg_field_mapping(self):
+    @pytest.mark.parametrize("key,expected", list(EXPECTED_RG_FIELDS.items()))
+    def test_rg_field_mapping(self, rg_fields, key, expected):
         """Testa mapeamento de campos do RG."""
-        # Chama o método de extração
-        fields = self.mindee_service._extract_rg_fields(SAMPLE_RG_RESPONSE)
-        
-        # Verifica se os campos foram mapeados corretamente
-        assert fields["nome"] == "GUILHERME FIRME FIOROT"
-        assert fields["numero_rg"] == "4.021.923 - ES"
-        assert fields["cpf"] == "188.433.327-32"
-        assert fields["data_emissao"] == "2020-02-07"
-        assert fields["nome_pai"] == "LEONARDO VICENTINI FIOROT"
-        assert fields["nome_mae"] == "GISELE FIRME BIANCHI FIOROT"
-        assert fields["data_nascimento"] == "2001-02-05"
-        assert fields["local_nascimento"] == "VITORIA - ES"
-        assert fields["orgao_emissor"] == "ES"
+        assert rg_fields[key] == expected
     
-    def test_field_value_extraction(self):
+    def test_field_value_extraction(self, mindee_service):
         """Testa extração de valores de campos."""
         # Testa campo com valor
         field_data = {"value": "test_value"}
-        result = self.mindee_service._get_field_value({"test_field": field_data}, "test_field")
+        result = mindee_service._get_field_value({"test_field": field_data}, "test_field")
         assert result == "test_value"
         
         # Testa campo sem valor
-        result = self.mindee_service._get_field_value({"test_field": {}}, "test_field")
+        result = mindee_service._get_field_value({"test_field": {}}, "test_field")
         assert result is None
         
         # Testa campo inexistente
-        result = self.mindee_service._get_field_value({}, "inexistent_field")
+        result = mindee_service._get_field_value({}, "inexistent_field")
         assert result is None
         
         # Testa valor direto (não dicionário)
-        result = self.mindee_service._get_field_value({"test_field": "direct_value"}, "test_field")
+        result = mindee_service._get_field_value({"test_field": "direct_value"}, "test_field")
         assert result == "direct_value"
     
-    def test_empty_response_handling(self):
-        """Testa tratamento de respostas vazias."""
-        empty_response = {"fields": {}}
-        
-        # CNH
-        fields = self.mindee_service._extract_cnh_fields(empty_response)
-        assert fields == {}
-        
-        # RG
-        fields = self.mindee_service._extract_rg_fields(empty_response)
-        assert fields == {}
-    
-    def test_malformed_response_handling(self):
-        """Testa tratamento de respostas malformadas."""
-        malformed_response = {"invalid_key": "invalid_value"}
-        
-        # CNH
-        fields = self.mindee_service._extract_cnh_fields(malformed_response)
-        assert fields == {}
-        
-        # RG
-        fields = self.mindee_service._extract_rg_fields(malformed_response)
-        assert fields == {}
+    @pytest.mark.parametrize("response", [
+        mindee_response({"fields": {}}),
+        {"invalid_key": "invalid_value"}
+    ], ids=["vazia", "malformada"])
+    @pytest.mark.parametrize("document_type", ["cnh", "rg"])
+    def test_empty_or_malformed_response(self, mindee_service, response, document_type):
+        """Testa respostas vazias ou malformadas: todos os campos ficam sem valor."""
+        fields = mindee_service._extract_fields(response, document_type)["extracted_fields"]
+        assert not any(fields.values())
 
 
 class TestFieldValidation:
     """Testes para validação de campos específicos."""
     
-    def setup_method(self):
-        """Configuração para cada teste."""
-        self.mindee_service = MindeeService("fake_api_key")
-    
-    def test_cnh_required_fields(self):
+    @pytest.mark.parametrize(
+        "field", ["nome", "cpf", "categoria", "data_emissao", "data_validade", "data_nascimento"]
+    )
+    def test_cnh_required_fields(self, cnh_fields, field):
         """Testa se campos obrigatórios da CNH estão presentes."""
-        fields = self.mindee_service._extract_cnh_fields(SAMPLE_CNH_RESPONSE)
-        
-        required_fields = ["nome", "cpf", "categoria", "data_emissao", "data_validade", "data_nascimento"]
-        
-        for field in required_fields:
-            assert field in fields, f"Campo obrigatório '{field}' não encontrado"
-            assert fields[field] is not None, f"Campo '{field}' está vazio"
+        assert field in cnh_fields, f"Campo obrigatório '{field}' não encontrado"
+        assert cnh_fields[field] is not None, f"Campo '{field}' está vazio"
     
-    def test_rg_required_fields(self):
+    @pytest.mark.parametrize("field", ["nome", "cpf", "numero_rg", "data_emissao", "data_nascimento"])
+    def test_rg_required_fields(self, rg_fields, field):
         """Testa se campos obrigatórios do RG estão presentes."""
-        fields = self.mindee_service._extract_rg_fields(SAMPLE_RG_RESPONSE)
-        
-        required_fields = ["nome", "cpf", "numero_rg", "data_emissao", "data_nascimento"]
-        
-        for field in required_fields:
-            assert field in fields, f"Campo obrigatório '{field}' não encontrado"
-            assert fields[field] is not None, f"Campo '{field}' está vazio"
+        assert field in rg_fields, f"Campo obrigatório '{field}' não encontrado"
+        assert rg_fields[field] is not None, f"Campo '{field}' está vazio"
     
-    def test_date_format_consistency(self):
+    @pytest.mark.parametrize("document_type,key", [
+        ("cnh", "data_emissao"),
+        ("cnh", "data_validade"),
+        ("cnh", "data_nascimento"),
+        ("cnh", "data_primeira_habilitacao"),
+        ("rg", "data_emissao"),
+        ("rg", "data_nascimento")
+    ])
+    def test_date_format_consistency(self, document_type, key):
         """Testa se as datas estão no formato correto."""
-        cnh_fields = self.mindee_service._extract_cnh_fields(SAMPLE_CNH_RESPONSE)
-        rg_fields = self.mindee_service._extract_rg_fields(SAMPLE_RG_RESPONSE)
+        date_str = _SAMPLE_FIELDS[document_type][key]
         
         # Verifica formato YYYY-MM-DD
-        date_fields = [
-            cnh_fields["data_emissao"],
-            cnh_fields["data_validade"],
-            cnh_fields["data_nascimento"],
-            cnh_fields["data_primeira_habilitacao"],
-            rg_fields["data_emissao"],
-            rg_fields["data_nascimento"]
-        ]
-        
-        for date_str in date_fields:
-            assert date_str is not None
-            assert len(date_str) == 10  # YYYY-MM-DD
-            assert date_str.count("-") == 2
-            parts = date_str.split("-")
-            assert len(parts) == 3
-            assert len(parts[0]) == 4  # Ano
-            assert len(parts[1]) == 2  # Mês
-            assert len(parts[2]) == 2  # Dia
-
+        assert date_str is not None and DATE_RE.fullmatch(date_str), date_str
 
 if __name__ == "__main__":
     pytest.main([__file__]) 
\ No newline at end of file